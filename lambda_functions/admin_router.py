@@ -8,35 +8,79 @@ TABLE_PASSES      – DynamoDB table with one row per pass
 TABLE_REGS        – DynamoDB table with one row per device-pass registration
 MAIL_QUEUE_URL    – SQS queue for individual “resend” requests
 BUCKET_PASSES     – S3 bucket that stores {serial}.pkpass
-PUSH_LAMBDA_ARN   – λ that sends a silent APNs ping (background push)
+PUSH_QUEUE_URL    – SQS queue drained by push_dispatcher.py (APNs pushes)
+TABLE_COUNTERS    – DynamoDB table with the maintained emailStatus counts; also
+                    holds the per-import dedupe markers
+                    (counter = import#importId#email#memberId; enable TTL on expiresAt)
+TABLE_FIXTURES    – DynamoDB table of fixtures (HASH fixtureId)
+
+Optional
+--------
+IMPORT_CHUNK      – CSV rows signed per import chunk / checkpoint (default 100)
+PASSES_STATUS_INDEX – GSI emailStatus HASH, email RANGE (default emailStatus-email-index)
+PASSES_EMAIL_INDEX  – GSI passTypeIdentifier HASH, email RANGE (default passType-email-index)
+BULK_WORKERS      – re-sign / write concurrency for bulk endpoints (default 16)
+BULK_UPDATE_MAX   – serials per POST /admin/bulkUpdate (default 500)
+FIXTURE_CHUNK     – passes re-signed per bulk-fixture chunk / checkpoint (default 200)
+BUILD_CACHE_BYTES – in-memory budget of the signed-pass cache (build_cache.py, default 32 MiB)
+IMPORT_MARKER_TTL – seconds an import's dedupe markers are kept (default 7 days)
+JOB_RESERVE_MS    – hand a long job to a fresh invocation when less than
+                    this much Lambda time is left (default 60000)
 """
 
 import base64
 import csv
+import hashlib
 import io
+import itertools
 import json
 import logging
 import os
+import re
 import time
-import zipfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from decimal import Decimal
 from importlib import import_module
+from urllib.parse import unquote
+
 
-import boto3
-from boto3.dynamodb.conditions import Key   # << needed for the GSI query
+import aws_io
+import build_cache
+import counters
+import pkzip
+import regs_keys
+import template_compiler
 
-# ── AWS clients / resources ────────────────────────────────────────────────────
-ddb       = boto3.resource("dynamodb")
-passes    = ddb.Table(os.environ["TABLE_PASSES"])
-regs      = ddb.Table(os.environ["TABLE_REGS"])
-lambda_c  = boto3.client("lambda")
-sqs       = boto3.client("sqs")
-s3        = boto3.client("s3")
+BULK_WORKERS = int(os.environ.get("BULK_WORKERS", "16"))
+
+# ── AWS clients / resources (shared pools, see aws_io.py) ──────────────────────
+passes    = aws_io.table(os.environ["TABLE_PASSES"])
+regs      = aws_io.table(os.environ["TABLE_REGS"])
+fixtures  = aws_io.table(os.environ["TABLE_FIXTURES"])
+markers   = aws_io.table(os.environ["TABLE_COUNTERS"])
+lambda_c  = aws_io.client("lambda")
+sqs       = aws_io.client("sqs")
+s3        = aws_io.client("s3")
 
 BULK   = os.environ["BULK_MAILER_ARN"]
 BUCKET = os.environ["BUCKET_PASSES"]
 QUEUE  = os.environ["MAIL_QUEUE_URL"]
-PUSH   = os.environ["PUSH_LAMBDA_ARN"]
+PUSH   = os.environ["PUSH_QUEUE_URL"]
+
+IMPORT_CHUNK   = int(os.environ.get("IMPORT_CHUNK", "100"))
+JOB_RESERVE_MS = int(os.environ.get("JOB_RESERVE_MS", "60000"))
+IMPORT_MARKER_TTL = int(os.environ.get("IMPORT_MARKER_TTL", str(7 * 24 * 3600)))
+BULK_UPDATE_MAX = int(os.environ.get("BULK_UPDATE_MAX", "500"))
+FIXTURE_CHUNK  = int(os.environ.get("FIXTURE_CHUNK", "200"))
+STATUS_INDEX   = os.environ.get("PASSES_STATUS_INDEX", "emailStatus-email-index")
+EMAIL_INDEX    = os.environ.get("PASSES_EMAIL_INDEX", "passType-email-index")
+PASS_TYPE      = "pass.uk.co.mk-lightning.season-ticket"
+PUSHES_PER_MSG = 100
+PUSH_SEND_ATTEMPTS = 3
+BUMP_ATTEMPTS  = 4
+EMAIL_RE       = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
 # ── logger (shows up in CloudWatch) ────────────────────────────────────────────
 logger = logging.getLogger()
@@ -44,26 +88,39 @@ logger.setLevel(logging.INFO)
 
 _now_ms = lambda: int(time.time() * 1000)
 
-# cache for the signer imported from main.py
-_build_pass = None
+# lazily imported signer.py / main.issue_passes
+_signer = None
+_issue_passes = None
 
 
 # ──────────────────────────────  ENTRY  ────────────────────────────────────────
 def lambda_handler(event, _ctx):
+    # self-invoked continuation of a long-running job
+    if event.get("job") == "import":
+        return _run_import(event["importId"], _ctx)
+    if event.get("job") == "fixture":
+        return _run_fixture(event["jobId"], _ctx)
+
     p   = event.get("rawPath", "")
     met = event.get("requestContext", {}).get("http", {}).get("method", "")
 
     if p == "/admin/metrics":
         return _metrics()
 
+    if p == "/admin/metrics/reconcile" and met == "POST":
+        return {"statusCode": 200, "body": json.dumps(counters.reconcile())}
+
     if p == "/admin/passes" and met == "GET":
-        return _list_passes()
+        return _list_passes(event.get("queryStringParameters") or {})
 
     if p.startswith("/admin/resend/"):
         return _single(p.rsplit("/", 1)[-1])
 
     if p == "/admin/import" and met == "POST":
-        return _import_csv(event)
+        return _import_csv(event, _ctx)
+
+    if p.startswith("/admin/import/") and met == "GET":
+        return _import_status(p.rsplit("/", 1)[-1])
 
     if p == "/admin/bulkSend":
         lambda_c.invoke(FunctionName=BULK, InvocationType="Event", Payload=b"{}")
@@ -72,119 +129,391 @@ def lambda_handler(event, _ctx):
     if p.startswith("/admin/passes/") and met == "GET":
         return _get_pass(p.rsplit("/", 1)[-1])
 
+    if p == "/admin/bulkUpdate" and met == "POST":
+        return _handle_bulk_update(event)
+
     if p.startswith("/admin/passes/") and met == "POST":
         return _handle_pass_update(event, p.rsplit("/", 1)[-1])
 
+    if p == "/admin/fixtures" and met == "GET":
+        return {"statusCode": 200, "body": json.dumps(_list_fixtures())}
+
+    if p == "/admin/fixtures" and met == "POST":
+        return _store_fixtures(event)
+
+    if p.startswith("/admin/fixtures/") and met == "DELETE":
+        fixtures.delete_item(Key={"fixtureId": unquote(p.rsplit("/", 1)[-1])})
+        return {"statusCode": 204}
+
+    if p == "/admin/bulkFixture" and met == "POST":
+        return _start_bulk_fixture(event, _ctx)
+
+    if p.startswith("/admin/bulkFixture/") and met == "GET":
+        return _fixture_status(p.rsplit("/", 1)[-1])
+
     return {"statusCode": 404}
 
 
 # ──────────────────────────────  HELPERS  ──────────────────────────────────────
-def _recreate_pkpass(serial: str, new_json: dict) -> None:
+def _recreate_pkpass(serial: str, new_json: dict, replaced: dict = None, unless: str = None):
     """
-    Download {serial}.pkpass from S3, replace pass.json, re-sign with the
-    existing _sign_pass_openssl() helper in main.py, and upload the package
-    back to the same key.
+    Incrementally re-package {serial}.pkpass: unchanged entries are copied
+    compressed, with their CRC and their SHA-1 from the old manifest.json;
+    only pass.json and any replaced files are hashed and deflated. The new
+    manifest is signed with signer.py – or a package with the same contents
+    is taken from build_cache.py – and uploaded to the same key.
+
+    Returns (fingerprint, assetsHash) of the new contents, or None – without
+    signing or uploading – when the fingerprint equals `unless`.
     """
-    global _build_pass
-    if _build_pass is None:
-        _build_pass = import_module("main")._sign_pass_openssl  # lazy import
+    global _signer
+    if _signer is None:
+        _signer = import_module("signer")  # lazy import
 
     obj = s3.get_object(Bucket=BUCKET, Key=f"{serial}.pkpass")
-    buf = io.BytesIO(obj["Body"].read())
-
-    files = {}
-    with zipfile.ZipFile(buf) as zf:
-        for name in zf.namelist():
-            if name.lower() in ("signature", "manifest.json", "pass.json"):
-                continue
-            if name.startswith(".DS_Store"):
-                continue
-            files[name] = zf.read(name)
-        files["pass.json"] = json.dumps(
+    old = pkzip.read_entries(obj["Body"].read())
+
+    changed = dict(replaced or {})
+    changed["pass.json"] = json.dumps(
         new_json, separators=(",", ":"), sort_keys=True
     ).encode()
-    new_pkpass = _build_pass(files)
+
+    try:
+        old_manifest = json.loads(old["manifest.json"].read())
+    except (KeyError, ValueError):
+        old_manifest = {}
+
+    out = pkzip.Writer()
+    manifest = {}
+    for name, entry in old.items():
+        if name.lower() in ("signature", "manifest.json", "pass.json") or name in changed:
+            continue
+        if name.startswith(".DS_Store"):
+            continue
+        manifest[name] = old_manifest.get(name) or hashlib.sha1(entry.read()).hexdigest()
+        out.add_raw(entry)
+    for name, data in changed.items():
+        manifest[name] = hashlib.sha1(data).hexdigest()
+        out.add(name, data)
+
+    assets = template_compiler.assets_hash(manifest)
+    fp = template_compiler.fingerprint(assets, changed["pass.json"])
+    if fp == unless:
+        logger.info("%s.pkpass unchanged – not re-signed", serial)
+        return None
+
+    def build():
+        manifest_bytes = json.dumps(manifest, separators=(",", ":"), sort_keys=True).encode()
+        out.add("manifest.json", manifest_bytes)
+        out.add("signature", _signer.sign_manifest(manifest_bytes))
+        return out.getvalue()
+
+    new_pkpass = build_cache.signed(build_cache.key(fp, _signer.credentials().versions), build)
     s3.put_object(
         Bucket=BUCKET,
         Key=f"{serial}.pkpass",
         Body=new_pkpass,
         ContentType="application/vnd.apple.pkpass",
     )
-    logger.info("Re-signed and uploaded %s.pkpass (%d bytes)", serial, len(new_pkpass))
+    logger.info("Uploaded %s.pkpass (%d bytes, %d changed)",
+                serial, len(new_pkpass), len(changed))
+    return fp, assets
 
 
-def _handle_pass_update(event, serial):
+def _unchanged(item, new_json, replaced):
     """
-    Update DynamoDB → regenerate .pkpass → push APNs to every
-    registered device → bump updatedAt in regs.
+    Fast path: with no replaced files, the stored assetsHash plus the new
+    canonical pass.json give the new fingerprint without touching S3.
     """
+    if replaced or not item or not item.get("fingerprint") or not item.get("assetsHash"):
+        return False
+    pass_json = json.dumps(new_json, separators=(",", ":"), sort_keys=True,
+                           default=_json_decimal_fix).encode()
+    return template_compiler.fingerprint(item["assetsHash"], pass_json) == item["fingerprint"]
+
+
+def _decode_files(files):
+    """{name: base64} from the editor → {name: bytes}; None if malformed."""
+    out = {}
+    for name, b64 in (files or {}).items():
+        if not isinstance(name, str) or "/" in name or name.lower() in (
+                "pass.json", "manifest.json", "signature"):
+            return None
+        try:
+            out[name] = base64.b64decode(b64, validate=True)
+        except (TypeError, ValueError):
+            return None
+    return out
+
+
+def _json_value(event, default=None):
+    """Parse the request body (`default` if empty) as JSON → (value, None) or (None, 400 response)."""
     raw_body = event.get("body", "")
     if event.get("isBase64Encoded"):
         try:
             raw_body = base64.b64decode(raw_body).decode("utf-8")
         except Exception:
-            return {"statusCode": 400, "body": "Invalid base64 body"}
+            return None, {"statusCode": 400, "body": "Invalid base64 body"}
 
     try:
-        body = json.loads(raw_body)
+        return json.loads(raw_body or default), None
     except (TypeError, json.JSONDecodeError):
-        return {"statusCode": 400, "body": "Invalid JSON body"}
+        return None, {"statusCode": 400, "body": "Invalid JSON body"}
 
+
+def _json_body(event, default=None):
+    """Parse the request body as a JSON object → (body, None) or (None, 400 response)."""
+    body, err = _json_value(event, default)
+    if err:
+        return None, err
     if not isinstance(body, dict):
-        return {"statusCode": 400, "body": "Body must be a JSON object"}
+        return None, {"statusCode": 400, "body": "Body must be a JSON object"}
+    return body, None
+
+
+def _registrations(serial):
+    """Every (deviceLibraryIdentifier, pushToken) registered for a serial."""
+    from boto3.dynamodb.conditions import Key
+    kwargs = dict(
+        IndexName="serialNumber-index",          # ← GSI!
+        KeyConditionExpression=Key("serialNumber").eq(serial),
+        ProjectionExpression="deviceLibraryIdentifier, passTypeIdentifier, pushToken",
+    )
+    items = []
+    while True:
+        resp = regs.query(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            return items
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+class PushQueueError(RuntimeError):
+    """Some pushes could not be queued; .queued is how many SQS accepted."""
+
+    def __init__(self, msg, queued):
+        super().__init__(msg)
+        self.queued = queued
+
+
+def _push(items):
+    """
+    Queue one APNs push per distinct (device token, pass type) for
+    push_dispatcher.py, PUSHES_PER_MSG pushes per message, ten messages per
+    SQS call. The APNs topic is the registration's own passTypeIdentifier.
+    Entries SQS reports as Failed are re-sent up to PUSH_SEND_ATTEMPTS times
+    with backoff; if some still fail, PushQueueError is raised. Returns the
+    number of pushes SQS accepted.
+    """
+    pushes = []
+    for i in items:
+        pass_type = i.get("passTypeIdentifier") or PASS_TYPE
+        pushes.append(((i["pushToken"], pass_type), {"token": i["pushToken"],
+                                                     "device": i["deviceLibraryIdentifier"],
+                                                     "passType": pass_type}))
+    pushes = list(dict(pushes).values())
+    msgs = [pushes[i:i + PUSHES_PER_MSG] for i in range(0, len(pushes), PUSHES_PER_MSG)]
+    queued, lost = 0, 0
+    for i in range(0, len(msgs), 10):
+        pending = {str(n): m for n, m in enumerate(msgs[i:i + 10])}
+        for attempt in range(PUSH_SEND_ATTEMPTS):
+            if attempt:
+                time.sleep(0.2 * 2 ** attempt)
+            resp = sqs.send_message_batch(QueueUrl=PUSH, Entries=[
+                {"Id": n, "MessageBody": json.dumps({"pushes": m})} for n, m in pending.items()
+            ])
+            for ok in resp.get("Successful", []):
+                queued += len(pending.pop(ok["Id"]))
+            if not pending:
+                break
+            for f in resp.get("Failed", []):
+                logger.warning("Could not queue pushes (attempt %d): %s", attempt + 1, f)
+        lost += sum(len(m) for m in pending.values())
+    if lost:
+        raise PushQueueError(f"{lost} of {len(pushes)} pushes could not be queued", queued)
+    return queued
+
+
+def _bump_chunk(rows):
+    """
+    One transaction for up to 100 (serial, registration, ts) rows. The
+    attribute_exists guard keeps a device that unregistered meanwhile from
+    being re-created; if it trips, the rest of the chunk is written again
+    without the vanished rows. A TransactionConflict (a device registering
+    at the same moment) is retried with backoff, BUMP_ATTEMPTS times.
+    """
+    tx = [{"Update": {
+        "TableName": regs.name,
+        "Key": {"deviceLibraryIdentifier": reg["deviceLibraryIdentifier"],
+                "serialNumber": serial},
+        "UpdateExpression": "SET updatedAt = :t, typeUpdated = :k",
+        "ConditionExpression": "attribute_exists(deviceLibraryIdentifier)",
+        "ExpressionAttributeValues": {
+            ":t": Decimal(str(ts)),
+            ":k": regs_keys.type_updated(reg.get("passTypeIdentifier", PASS_TYPE), ts),
+        },
+    }} for serial, reg, ts in rows]
+    conflict = False
+    for attempt in range(BUMP_ATTEMPTS):
+        if conflict:
+            time.sleep(0.05 * 2 ** attempt)
+        try:
+            regs.meta.client.transact_write_items(TransactItems=tx)
+            return
+        except regs.meta.client.exceptions.TransactionCanceledException as e:
+            reasons = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+            if not reasons or any(c not in ("None", "ConditionalCheckFailed", "TransactionConflict")
+                                  for c in reasons):
+                raise
+            tx = [t for t, c in zip(tx, reasons) if c != "ConditionalCheckFailed"]
+            if not tx:
+                return
+            conflict = "TransactionConflict" in reasons
+            if conflict:
+                logger.warning("Registration bump conflicted (attempt %d), retrying", attempt + 1)
+    raise RuntimeError(f"registration bump still conflicting after {BUMP_ATTEMPTS} attempts")
+
+
+def _bump_registrations(rows, pool):
+    """
+    Bump updatedAt – and the typeUpdated sort key router.py lists by – on
+    every (serial, registration, ts) row so /registrations?passesUpdatedSince
+    sees the change. Transactions of 100 run concurrently on `pool`; callers
+    do this before queueing pushes so a device never polls ahead of its row.
+    A chunk that cannot be written is logged and skipped – callers push
+    regardless, so a failed bump never swallows the push. Returns the
+    number of rows not bumped.
+    """
+    def bump(chunk):
+        try:
+            _bump_chunk(chunk)
+            return 0
+        except Exception:
+            logger.exception("Could not bump %d registrations", len(chunk))
+            return len(chunk)
+
+    chunks = [rows[i:i + 100] for i in range(0, len(rows), 100)]
+    return sum(pool.map(bump, chunks))
+
+
+def _merge_patch(target, patch):
+    """
+    JSON merge patch (RFC 7386) with one PassKit twist: a list of field
+    dicts is merged element-wise by their "key" (headerFields, …), so a patch
+    can touch one field without restating the others.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    out = dict(target) if isinstance(target, dict) else {}
+    for k, v in patch.items():
+        if v is None:
+            out.pop(k, None)
+        elif isinstance(v, list) and isinstance(out.get(k), list) and all(
+                isinstance(e, dict) and "key" in e for e in v):
+            fields = list(out[k])
+            index = {f.get("key"): i for i, f in enumerate(fields) if isinstance(f, dict)}
+            for e in v:
+                if e["key"] in index:
+                    fields[index[e["key"]]] = _merge_patch(fields[index[e["key"]]], e)
+                else:
+                    fields.append(e)
+            out[k] = fields
+        else:
+            out[k] = _merge_patch(out.get(k), v)
+    return out
+
+
+def _keyless_field(patch, path=""):
+    """
+    Path of the first PassKit field array (headerFields, backFields, …) in
+    `patch` with an entry that has no "key", else None. _merge_patch would
+    replace the whole stored array with such a list.
+    """
+    if not isinstance(patch, dict):
+        return None
+    for k, v in patch.items():
+        where = f"{path}.{k}" if path else k
+        if k.endswith("Fields") and isinstance(v, list):
+            if any(not isinstance(e, dict) or not e.get("key") for e in v):
+                return where
+        elif isinstance(v, dict):
+            found = _keyless_field(v, where)
+            if found:
+                return found
+    return None
+
+
+def _handle_pass_update(event, serial):
+    """
+    Regenerate .pkpass → update DynamoDB → bump updatedAt in regs →
+    push APNs to every registered device. Nothing of that happens when the
+    submitted pass has the fingerprint already stored for it.
+    """
+    body, err = _json_body(event)
+    if err:
+        return err
 
     pass_data = body.get("passData")
     if pass_data is None:
         return {"statusCode": 400, "body": "Missing passData"}
 
+    replaced = _decode_files(body.get("files"))
+    if replaced is None:
+        return {"statusCode": 400, "body": "Invalid files"}
+
     # ① guarantee lastModified strictly increases
     new_ts = _now_ms()
-    current = passes.get_item(Key={"serialNumber": serial}).get("Item")
+    current = passes.get_item(
+        Key={"serialNumber": serial},
+        ProjectionExpression="lastModified, fingerprint, assetsHash",
+    ).get("Item")
     prev_ts = int(current.get("lastModified", 0)) if current else 0
     if new_ts <= prev_ts:
         new_ts = prev_ts + 1
 
+    # ② rebuild and upload the pkpass – unless the content is unchanged
+    try:
+        built = None if _unchanged(current, pass_data, replaced) else \
+            _recreate_pkpass(serial, pass_data, replaced, unless=(current or {}).get("fingerprint"))
+    except Exception as e:
+        logger.exception("Re-sign failed for %s: %s", serial, e)
+        return {"statusCode": 500, "body": "Could not re-sign pkpass"}
+    if built is None:
+        logger.info("UNCHANGED serial=%s – no re-sign, no push", serial)
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"ok": True, "lastModified": prev_ts, "pushed": False,
+                                "unchanged": True}),
+        }
+
     passes.update_item(
         Key={"serialNumber": serial},
-        UpdateExpression="SET passData = :d, lastModified = :t",
+        UpdateExpression="SET passData = :d, lastModified = :t, fingerprint = :f, assetsHash = :a",
         ExpressionAttributeValues={
             ":d": json.dumps(pass_data, default=_json_decimal_fix),
             ":t": Decimal(str(new_ts)),
+            ":f": built[0],
+            ":a": built[1],
         },
     )
 
-    # ② rebuild and upload the pkpass
-    try:
-        _recreate_pkpass(serial, pass_data)
-    except Exception as e:
-        logger.exception("Re-sign failed for %s: %s", serial, e)
-        return {"statusCode": 500, "body": "Could not re-sign pkpass"}
-
     # ③ fetch every registration for this serial (GSI on regs required)
-    regs_resp = regs.query(
-        IndexName="serialNumber-index",          # ← GSI!
-        KeyConditionExpression=Key("serialNumber").eq(serial),
-        ProjectionExpression="deviceLibraryIdentifier, pushToken",
-    )
+    items = _registrations(serial)
 
-    # ④ fire a background push for each device (fan-out, non-blocking)
-    for item in regs_resp.get("Items", []):
-        lambda_c.invoke(
-            FunctionName=PUSH,
-            InvocationType="Event",
-            Payload=json.dumps({"token": item["pushToken"]}).encode(),
-        )
+    # ④ bump updatedAt so /registrations?passesUpdatedSince sees the change …
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+        _bump_registrations([(serial, i, new_ts) for i in items], pool)
 
-    # ⑤ bump updatedAt so /registrations?passesUpdatedSince works
-    for item in regs_resp.get("Items", []):
-        regs.update_item(
-            Key={
-                "deviceLibraryIdentifier": item["deviceLibraryIdentifier"],
-                "serialNumber": serial,
-                },
-                UpdateExpression="SET updatedAt = :t",
-                ExpressionAttributeValues={":t": Decimal(str(new_ts))},
-                )
+    # ⑤ … before any device is told to look
+    try:
+        _push(items)
+    except PushQueueError as e:
+        logger.error("UPDATED serial=%s but push failed: %s", serial, e)
+        return {
+            "statusCode": 502,
+            "body": json.dumps({"ok": False, "lastModified": new_ts, "pushed": False,
+                                "error": str(e)}),
+        }
 
     logger.info("UPDATED + PUSHED serial=%s lastModified=%s", serial, new_ts)
     return {
@@ -193,6 +522,140 @@ def _handle_pass_update(event, serial):
     }
 
 
+def _handle_bulk_update(event):
+    """
+    POST /admin/bulkUpdate  {serials: [...], patch: {...}, files: {name: b64}}
+
+    Applies one merge patch (see _merge_patch) to every listed pass:
+    batch read → re-sign on a worker pool → per-row writes
+    → one push per distinct device token across the whole set.
+    """
+    body, err = _json_body(event)
+    if err:
+        return err
+
+    serials = body.get("serials")
+    patch   = body.get("patch") or {}
+    if not isinstance(serials, list) or not serials or not isinstance(patch, dict):
+        return {"statusCode": 400, "body": "Need serials and a patch object"}
+    if len(serials) > BULK_UPDATE_MAX:
+        return {"statusCode": 413, "body": f"At most {BULK_UPDATE_MAX} serials per call"}
+    keyless = _keyless_field(patch)
+    if keyless:
+        return {"statusCode": 400, "body": f"Every entry of {keyless} needs a key"}
+    serials  = list(dict.fromkeys(serials))
+    replaced = _decode_files(body.get("files"))
+    if replaced is None:
+        return {"statusCode": 400, "body": "Invalid files"}
+
+    # ① batch read current passData / lastModified
+    current = {}
+    for i in range(0, len(serials), 100):
+        request = {passes.name: {
+            "Keys": [{"serialNumber": s} for s in serials[i:i + 100]],
+            "ProjectionExpression": "serialNumber, passData, lastModified, fingerprint, assetsHash",
+        }}
+        while request:
+            resp = aws_io.resource("dynamodb").batch_get_item(RequestItems=request)
+            for item in resp["Responses"].get(passes.name, []):
+                current[item["serialNumber"]] = item
+            request = resp.get("UnprocessedKeys")
+
+    now = _now_ms()
+    updates, failed, unchanged = {}, [], []
+    for serial in serials:
+        item = current.get(serial)
+        if not item:
+            failed.append({"serialNumber": serial, "error": "not found"})
+            continue
+        try:
+            new_pd = _merge_patch(json.loads(item.get("passData") or "{}"), patch)
+        except ValueError:
+            failed.append({"serialNumber": serial, "error": "stored passData is not JSON"})
+            continue
+        if _unchanged(item, new_pd, replaced):
+            unchanged.append(serial)
+            continue
+        updates[serial] = (new_pd, max(now, int(item.get("lastModified", 0)) + 1),
+                           item.get("fingerprint"))
+
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+        # ②③ re-sign in parallel, write passData + lastModified
+        done = _apply_updates(updates, replaced, pool, failed, unchanged)
+
+        # ④ registrations for every updated serial; bump them all first …
+        regs_by_serial = dict(zip(done, pool.map(_registrations, done)))
+        _bump_registrations([(s, r, updates[s][1]) for s in done for r in regs_by_serial[s]], pool)
+
+        # ⑤ … then one push per device token
+        push_error = None
+        try:
+            pushed = _push([r for items in regs_by_serial.values() for r in items])
+        except PushQueueError as e:
+            logger.error("BULK push failed: %s", e)
+            pushed, push_error = e.queued, str(e)
+
+    logger.info("BULK UPDATED %d passes, %d unchanged, %d failed, %d pushes; build cache %s",
+                len(done), len(unchanged), len(failed), pushed, build_cache.stats())
+    result = {"updated": len(done), "unchanged": len(unchanged), "failed": failed, "pushed": pushed}
+    if push_error:
+        result["pushError"] = push_error
+    return {"statusCode": 502 if push_error else 200, "body": json.dumps(result)}
+
+
+def _apply_updates(updates, replaced, pool, failed, unchanged):
+    """
+    Re-sign every {serial: (passData, lastModified, stored fingerprint)} on
+    `pool`, then write passData, lastModified and the new fingerprint of the
+    ones that signed, one update_item each on the same pool. Serials that
+    could not be re-signed or written go to `failed`, those whose content
+    turned out identical to `unchanged`; returns the rest.
+    """
+    def resign(serial):
+        try:
+            pd, _, fp = updates[serial]
+            return serial, _recreate_pkpass(serial, pd, replaced, unless=fp), None
+        except Exception as e:
+            logger.exception("Re-sign failed for %s", serial)
+            return serial, None, str(e)
+
+    signed, built = [], {}
+    for serial, result, error in pool.map(resign, list(updates)):
+        if error:
+            failed.append({"serialNumber": serial, "error": error})
+        elif result is None:
+            unchanged.append(serial)
+        else:
+            signed.append(serial)
+            built[serial] = result
+
+    # independent rows: one update each, so a single failure stays single
+    def write(s):
+        try:
+            passes.update_item(
+                Key={"serialNumber": s},
+                UpdateExpression="SET passData = :d, lastModified = :t, fingerprint = :f, assetsHash = :a",
+                ExpressionAttributeValues={
+                    ":d": json.dumps(updates[s][0], default=_json_decimal_fix),
+                    ":t": Decimal(str(updates[s][1])),
+                    ":f": built[s][0],
+                    ":a": built[s][1],
+                },
+            )
+            return s, None
+        except Exception as e:
+            logger.exception("Writing %s failed", s)
+            return s, str(e)
+
+    done = []
+    for serial, error in pool.map(write, signed):
+        if error:
+            failed.append({"serialNumber": serial, "error": error})
+        else:
+            done.append(serial)
+    return done
+
+
 def _json_decimal_fix(obj):
     """Allow json.dumps() to serialise Decimal values."""
     if isinstance(obj, Decimal):
@@ -200,20 +663,112 @@ def _json_decimal_fix(obj):
     raise TypeError
 
 
+# ── resumable jobs: checkpoint in S3, continue in a fresh async invocation ──────
+def _save_job(kind, job_id, state):
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=f"jobs/{kind}/{job_id}.json",
+        Body=json.dumps(state).encode(),
+        ContentType="application/json",
+    )
+
+
+def _load_job(kind, job_id):
+    try:
+        obj = s3.get_object(Bucket=BUCKET, Key=f"jobs/{kind}/{job_id}.json")
+    except s3.exceptions.NoSuchKey:
+        return None
+    return json.loads(obj["Body"].read())
+
+
+def _continue_job(ctx, payload):
+    lambda_c.invoke(
+        FunctionName=ctx.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(payload).encode(),
+    )
+
+
+def _job_error(state, msg, keep=50):
+    if len(state["errors"]) < keep:
+        state["errors"].append(msg)
+
+
 # ────────────────────────────  ADMIN ROUTES  ───────────────────────────────────
 def _metrics():
-    cnt = lambda st: passes.scan(Select='COUNT',
-                                 FilterExpression='emailStatus = :s',
-                                 ExpressionAttributeValues={':s': st})['Count']
+    # one GetItem on the maintained counters (see counters.py)
+    cnt = counters.read()
     return {"statusCode": 200,
-            "body": json.dumps(dict(pending=cnt('pending'),
-                                    queued=cnt('queued'),
-                                    mailed=cnt('mailed')))}
+            "body": json.dumps(dict(pending=cnt.get('pending', 0),
+                                    queued=cnt.get('queued', 0),
+                                    # pass_mailer writes "Mailed"
+                                    mailed=cnt.get('mailed', 0) + cnt.get('Mailed', 0),
+                                    installed=cnt.get('installed', 0),
+                                    # this container's signed-pass cache (build_cache.py)
+                                    buildCache=build_cache.stats()))}
+
+
+# attributes returned by GET /admin/passes; passData only with ?include=passData
+LIST_FIELDS = ("serialNumber", "email", "emailStatus", "lastModified", "memberId",
+               "firstName", "lastName", "installedAt", "passTypeIdentifier")
+LIST_LIMIT_MAX = 200
+
 
+def _encode_cursor(key):
+    if not key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key, default=_json_decimal_fix).encode()).decode()
 
-def _list_passes():
-    items = passes.scan()["Items"]
-    return {"statusCode": 200, "body": json.dumps(items, default=str)}
+
+def _decode_cursor(token):
+    return json.loads(base64.urlsafe_b64decode(token.encode()))
+
+
+def _list_passes(qs):
+    """
+    One page of passes.
+
+    Query params: limit (≤ LIST_LIMIT_MAX, default 50), cursor (opaque token
+    from the previous page), status, emailPrefix, include=passData.
+    status / emailPrefix are served from GSIs, so a filtered page costs
+    the same however large the table is.
+    """
+    from boto3.dynamodb.conditions import Key
+    try:
+        limit = max(1, min(int(qs.get("limit") or 50), LIST_LIMIT_MAX))
+        start = _decode_cursor(qs["cursor"]) if qs.get("cursor") else None
+    except (ValueError, TypeError):
+        return {"statusCode": 400, "body": "Invalid limit or cursor"}
+
+    fields = LIST_FIELDS + (("passData",) if qs.get("include") == "passData" else ())
+    names  = {f"#f{i}": f for i, f in enumerate(fields)}
+    kwargs = {
+        "Limit": limit,
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+    if start:
+        kwargs["ExclusiveStartKey"] = start
+
+    status, prefix = qs.get("status"), qs.get("emailPrefix")
+    if status:
+        cond = Key("emailStatus").eq(status)
+        if prefix:
+            cond &= Key("email").begins_with(prefix)
+        resp = passes.query(IndexName=STATUS_INDEX, KeyConditionExpression=cond, **kwargs)
+    elif prefix:
+        resp = passes.query(
+            IndexName=EMAIL_INDEX,
+            KeyConditionExpression=Key("passTypeIdentifier").eq(PASS_TYPE) & Key("email").begins_with(prefix),
+            **kwargs,
+        )
+    else:
+        resp = passes.scan(**kwargs)
+
+    return {"statusCode": 200, "body": json.dumps({
+        "items": resp["Items"],
+        "cursor": _encode_cursor(resp.get("LastEvaluatedKey")),
+    }, default=str)}
 
 
 def _single(serial):
@@ -235,7 +790,12 @@ def _single(serial):
     return {"statusCode": 202}
 
 
-def _import_csv(event):
+def _import_csv(event, ctx):
+    """
+    Stash the CSV in S3, create a checkpoint and hand the actual import to
+    an async invocation of this λ (see _run_import). Returns the importId
+    that GET /admin/import/{id} reports progress for.
+    """
     body = event.get("body", "")
     if event.get("isBase64Encoded"):
         try:
@@ -243,14 +803,396 @@ def _import_csv(event):
         except Exception:
             return {"statusCode": 400, "body": "Invalid base64 CSV"}
 
-    rdr = csv.DictReader(io.StringIO(body))
-    for row in rdr:
-        pass  # createPass logic goes here
-    return {"statusCode": 200, "body": "uploaded"}
+    import_id = str(uuid.uuid4())
+    s3.put_object(
+        Bucket=BUCKET,
+        Key=f"imports/{import_id}.csv",
+        Body=body.encode("utf-8"),
+        ContentType="text/csv",
+    )
+    _save_job("import", import_id, {
+        "importId": import_id,
+        "status": "running",
+        "rows": 0,
+        "created": 0,
+        "duplicates": 0,
+        "invalid": 0,
+        "failed": 0,
+        "errors": [],
+        "startedAt": _now_ms(),
+    })
+    _continue_job(ctx, {"job": "import", "importId": import_id})
+    return {"statusCode": 202, "body": json.dumps({"importId": import_id})}
+
+
+def _import_status(import_id):
+    state = _load_job("import", import_id)
+    if not state:
+        return {"statusCode": 404, "body": "Not found"}
+    return {"statusCode": 200, "body": json.dumps(state)}
+
+
+def _import_record(row):
+    """Validate one CSV row → ({email, memberId?, passData}, None) or (None, error)."""
+    row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if isinstance(k, str)}
+    email = row.get("email", "")
+    if not EMAIL_RE.match(email):
+        return None, f"invalid email {email!r}"
+
+    rec = {"email": email, "passData": {}}
+    if row.get("memberid"):
+        rec["memberId"] = row["memberid"]
+    if row.get("passdata"):
+        try:
+            rec["passData"] = json.loads(row["passdata"])
+        except json.JSONDecodeError:
+            return None, "passData is not valid JSON"
+        if not isinstance(rec["passData"], dict):
+            return None, "passData must be a JSON object"
+    return rec, None
+
+
+def _marker_key(import_id, rec):
+    return {"counter": f"import#{import_id}#{rec['email'].lower()}#{rec.get('memberId', '')}"}
+
+
+def _claim(import_id, line, rec):
+    """
+    Conditionally create this import's (email, memberId) marker for CSV
+    line `line`. Returns "new" when this row may issue a pass, "issued" when
+    a replay of this very row already issued one, "duplicate" when an
+    earlier line of the same file holds it.
+
+    The marker is re-claimable only by the same line while it carries no
+    serialNumber, so a chunk replayed after a timeout picks up where it
+    stopped instead of issuing twice. Markers are scoped to one import and
+    expire after IMPORT_MARKER_TTL, so a later import may issue again.
+    """
+    try:
+        markers.put_item(
+            Item={**_marker_key(import_id, rec), "importLine": line,
+                  "expiresAt": int(time.time()) + IMPORT_MARKER_TTL},
+            ConditionExpression="attribute_not_exists(#c) OR "
+                                "(importLine = :l AND attribute_not_exists(serialNumber))",
+            ExpressionAttributeNames={"#c": "counter"},
+            ExpressionAttributeValues={":l": line},
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+        return "new"
+    except markers.meta.client.exceptions.ConditionalCheckFailedException as e:
+        old = e.response.get("Item") or {}
+        return "issued" if old.get("importLine", {}).get("N") == str(line) else "duplicate"
+
+
+def _settle(import_id, line, rec, serial):
+    """Record the issued pass on the marker, or release it if issuing failed."""
+    if serial:
+        markers.update_item(Key=_marker_key(import_id, rec), UpdateExpression="SET serialNumber = :s",
+                            ExpressionAttributeValues={":s": serial})
+    else:
+        markers.delete_item(Key=_marker_key(import_id, rec),
+                            ConditionExpression="importLine = :l",
+                            ExpressionAttributeValues={":l": line})
+
+
+def _run_import(import_id, ctx):
+    """
+    Stream imports/{id}.csv from S3 and issue passes IMPORT_CHUNK rows at a
+    time. A checkpoint is written after every chunk, so when the λ runs low
+    on time it re-invokes itself and carries on from the last chunk rather
+    than from row 1. Duplicate (email, memberId) pairs within the file, and
+    rows of a replayed chunk, are caught by a conditional marker write (see
+    _claim), so memory and the checkpoint stay the same size however many
+    rows the file has.
+    """
+    global _issue_passes
+    if _issue_passes is None:
+        _issue_passes = import_module("main").issue_passes  # lazy import
+
+    state = _load_job("import", import_id)
+    if not state or state["status"] != "running":
+        return {"statusCode": 200}
+
+    obj  = s3.get_object(Bucket=BUCKET, Key=f"imports/{import_id}.csv")
+    rows = itertools.islice(
+        csv.DictReader(io.TextIOWrapper(obj["Body"], encoding="utf-8", newline="")),
+        state["rows"], None,
+    )
+
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+        while True:
+            chunk = list(itertools.islice(rows, IMPORT_CHUNK))
+            if not chunk:
+                break
+
+            valid, in_chunk = [], set()
+            for n, row in enumerate(chunk, start=state["rows"] + 2):   # +header, 1-based
+                rec, err = _import_record(row)
+                if err:
+                    state["invalid"] += 1
+                    _job_error(state, f"line {n}: {err}")
+                    continue
+                # claims run in parallel: settle repeats within the chunk here
+                # so the first line always wins
+                key = _marker_key(import_id, rec)["counter"]
+                if key in in_chunk:
+                    state["duplicates"] += 1
+                    continue
+                in_chunk.add(key)
+                valid.append((n, rec))
+
+            lines, records = [], []
+            claims = pool.map(lambda v: _claim(import_id, *v), valid)
+            for (n, rec), claim in zip(valid, claims):
+                if claim == "new":
+                    lines.append(n)
+                    records.append(rec)
+                elif claim == "issued":
+                    state["created"] += 1
+                else:
+                    state["duplicates"] += 1
+
+            results = _issue_passes(records) if records else []
+            for res in results:
+                if res["ok"]:
+                    state["created"] += 1
+                else:
+                    state["failed"] += 1
+                    _job_error(state, f"{records[res['index']]['email']}: {res['error']}")
+            list(pool.map(lambda res: _settle(import_id, lines[res["index"]], records[res["index"]],
+                                              res.get("serialNumber")), results))
+
+            state["rows"] += len(chunk)
+            _save_job("import", import_id, state)
+            logger.info("IMPORT %s rows=%d created=%d", import_id, state["rows"], state["created"])
+
+            if ctx and ctx.get_remaining_time_in_millis() < JOB_RESERVE_MS:
+                _continue_job(ctx, {"job": "import", "importId": import_id})
+                return {"statusCode": 202}
+
+    state["status"] = "done"
+    state["finishedAt"] = _now_ms()
+    _save_job("import", import_id, state)
+    s3.delete_object(Bucket=BUCKET, Key=f"imports/{import_id}.csv")
+    logger.info("IMPORT %s done: %s", import_id,
+                {k: state[k] for k in ("rows", "created", "duplicates", "invalid", "failed")})
+    return {"statusCode": 200}
 
 
 def _get_pass(serial):
     item = passes.get_item(Key={"serialNumber": serial}).get("Item")
     if not item:
         return {"statusCode": 404, "body": "Not found"}
-    return {"statusCode": 200, "body": item["passData"]}
\ No newline at end of file
+    return {"statusCode": 200, "body": item["passData"]}
+
+# ───────────────────────────────  FIXTURES  ────────────────────────────────────
+def _parse_game_date(value):
+    """ISO-8601 string from the Fixtures page → aware datetime, or None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _list_fixtures():
+    kwargs, items = {}, []
+    while True:
+        resp = fixtures.scan(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+    items.sort(key=lambda f: f.get("gameDate", ""))
+    return items
+
+
+def _store_fixtures(event):
+    """POST /admin/fixtures  [{fixtureId?, gameDate, opponent}, …]"""
+    body, err = _json_value(event, "[]")
+    if err:
+        return err
+    if isinstance(body, dict):
+        body = body.get("fixtures")
+    if not isinstance(body, list):
+        return {"statusCode": 400, "body": "Expected a list of fixtures"}
+
+    rows = []
+    for n, f in enumerate(body):
+        if not isinstance(f, dict) or not _parse_game_date(f.get("gameDate")) \
+                or not str(f.get("opponent") or "").strip():
+            return {"statusCode": 400, "body": f"Fixture {n}: need gameDate (ISO) and opponent"}
+        opponent = str(f["opponent"]).strip()
+        rows.append({
+            "fixtureId": f.get("fixtureId") or f"{f['gameDate']}#{opponent}",
+            "gameDate":  f["gameDate"],
+            "opponent":  opponent,
+        })
+
+    with fixtures.batch_writer(overwrite_by_pkeys=["fixtureId"]) as bw:
+        for row in rows:
+            bw.put_item(Item=row)
+    return {"statusCode": 200, "body": json.dumps({"stored": len(rows)})}
+
+
+def _next_fixture():
+    now = datetime.now(timezone.utc)
+    upcoming = [f for f in _list_fixtures()
+                if (_parse_game_date(f.get("gameDate")) or now) > now]
+    return upcoming[0] if upcoming else None
+
+
+def _fixture_patch(fixture):
+    """The pass.json merge patch (see _merge_patch) that shows `fixture`."""
+    return {
+        "relevantDate": fixture["gameDate"],
+        "eventTicket": {
+            "headerFields": [{"key": "nextGame", "label": "NEXT GAME",
+                              "value": fixture["gameDate"], "dateStyle": "PKDateStyleShort"}],
+            "secondaryFields": [{"key": "opponent", "label": "OPPONENT",
+                                 "value": fixture["opponent"]}],
+        },
+    }
+
+
+def _start_bulk_fixture(event, ctx):
+    """
+    POST /admin/bulkFixture  {datetime, opponent} | {fixtureId} | {}
+
+    Rolls a fixture (the given one, or the next upcoming stored fixture)
+    into every season ticket. The work runs as a resumable job (see
+    _run_fixture); GET /admin/bulkFixture/{jobId} reports progress.
+    """
+    body, err = _json_body(event, "{}")
+    if err:
+        return err
+
+    if body.get("datetime") or body.get("opponent"):
+        fixture = {"gameDate": body.get("datetime"), "opponent": str(body.get("opponent") or "").strip()}
+    elif body.get("fixtureId"):
+        fixture = fixtures.get_item(Key={"fixtureId": body["fixtureId"]}).get("Item")
+        if not fixture:
+            return {"statusCode": 404, "body": "Unknown fixture"}
+    else:
+        fixture = _next_fixture()
+        if not fixture:
+            return {"statusCode": 404, "body": "No upcoming fixture"}
+    if not _parse_game_date(fixture.get("gameDate")) or not fixture.get("opponent"):
+        return {"statusCode": 400, "body": "Need datetime (ISO) and opponent"}
+
+    job_id = str(uuid.uuid4())
+    _save_job("fixture", job_id, {
+        "jobId": job_id,
+        "status": "running",
+        "fixture": {"gameDate": fixture["gameDate"], "opponent": fixture["opponent"]},
+        "cursor": None,
+        "scanned": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "pushed": 0,
+        "pushTo": {},
+        "errors": [],
+        "busyMs": 0,
+        "passesPerSecond": 0,
+        "startedAt": _now_ms(),
+    })
+    _continue_job(ctx, {"job": "fixture", "jobId": job_id})
+    return {"statusCode": 202, "body": json.dumps({"jobId": job_id})}
+
+
+def _fixture_status(job_id):
+    state = _load_job("fixture", job_id)
+    if not state:
+        return {"statusCode": 404, "body": "Not found"}
+    state.pop("cursor", None)
+    state.pop("pushTo", None)
+    return {"statusCode": 200, "body": json.dumps(state)}
+
+
+def _run_fixture(job_id, ctx):
+    """
+    Page through the season tickets FIXTURE_CHUNK at a time: merge the
+    fixture into each pass.json, re-sign the chunk in parallel and write it
+    row by row, checkpointing after every chunk and handing over to a fresh
+    invocation when time runs low. The registrations of each chunk's
+    updated serials are bumped with that chunk and their tokens kept in the
+    checkpoint; devices are told once, at the end, with one push per
+    distinct token – and not at all if nothing changed.
+    """
+    from boto3.dynamodb.conditions import Attr
+    state = _load_job("fixture", job_id)
+    if not state or state["status"] != "running":
+        return {"statusCode": 200}
+
+    patch  = _fixture_patch(state["fixture"])
+    kwargs = {
+        "Limit": FIXTURE_CHUNK,
+        "FilterExpression": Attr("passTypeIdentifier").eq(PASS_TYPE),
+        "ProjectionExpression": "serialNumber, passData, lastModified, fingerprint, assetsHash",
+    }
+
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+        while state["cursor"] is not False:
+            t0 = time.monotonic()
+            if state["cursor"]:
+                kwargs["ExclusiveStartKey"] = state["cursor"]
+            page = passes.scan(**kwargs)
+
+            now, updates, failed, unchanged = _now_ms(), {}, [], []
+            for item in page["Items"]:
+                try:
+                    new_pd = _merge_patch(json.loads(item.get("passData") or "{}"), patch)
+                except ValueError:
+                    failed.append({"serialNumber": item["serialNumber"],
+                                   "error": "stored passData is not JSON"})
+                    continue
+                if _unchanged(item, new_pd, None):
+                    unchanged.append(item["serialNumber"])
+                    continue
+                updates[item["serialNumber"]] = (new_pd, max(now, int(item.get("lastModified", 0)) + 1),
+                                                 item.get("fingerprint"))
+            done = _apply_updates(updates, None, pool, failed, unchanged)
+
+            # bump this chunk's registrations now, push them all at the end
+            regs_by_serial = dict(zip(done, pool.map(_registrations, done)))
+            _bump_registrations([(s, r, updates[s][1]) for s in done for r in regs_by_serial[s]], pool)
+            for items in regs_by_serial.values():
+                for r in items:
+                    state["pushTo"][f"{r['pushToken']} {r.get('passTypeIdentifier') or PASS_TYPE}"] = r
+
+            state["scanned"] += len(page["Items"])
+            state["updated"] += len(done)
+            state["unchanged"] += len(unchanged)
+            state["failed"]  += len(failed)
+            for f in failed:
+                _job_error(state, f"{f['serialNumber']}: {f['error']}")
+            state["cursor"]  = page.get("LastEvaluatedKey") or False
+            state["busyMs"] += int((time.monotonic() - t0) * 1000)
+            state["passesPerSecond"] = round(state["updated"] * 1000 / max(state["busyMs"], 1), 1)
+            _save_job("fixture", job_id, state)
+            logger.info("FIXTURE %s scanned=%d updated=%d (%.1f passes/s)",
+                        job_id, state["scanned"], state["updated"], state["passesPerSecond"])
+
+            if state["cursor"] and ctx and ctx.get_remaining_time_in_millis() < JOB_RESERVE_MS:
+                _continue_job(ctx, {"job": "fixture", "jobId": job_id})
+                return {"statusCode": 202}
+
+    # one coalesced push round for the devices of every updated pass
+    push_to = state.pop("pushTo")
+    if state["updated"]:
+        try:
+            state["pushed"] = _push(list(push_to.values()))
+        except PushQueueError as e:
+            state["pushed"] = e.queued
+            _job_error(state, str(e))
+
+    state["status"] = "done"
+    state["finishedAt"] = _now_ms()
+    _save_job("fixture", job_id, state)
+    logger.info("FIXTURE %s done: %s", job_id,
+                {k: state[k] for k in ("scanned", "updated", "unchanged", "failed", "pushed",
+                                       "passesPerSecond")})
+    return {"statusCode": 200}
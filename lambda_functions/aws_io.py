@@ -0,0 +1,114 @@
+"""
+Shared AWS I/O layer for the lambda_functions modules.
+
+One boto3 session, one client / resource per service per container, all on
+the same tuned Config: a connection pool big enough for our worker pools,
+TCP keep-alive so warm invocations reuse their sockets, and standard-mode
+retries. gather() runs independent calls (an S3 put and a Dynamo put, say)
+concurrently on a shared executor instead of one after the other.
+
+Nothing is built at import: client(), resource() and table() hand out Lazy
+proxies that construct the real object on first attribute access, so a
+cold start only pays for the clients its first request actually touches
+(see cold_start.py).
+
+Setting AWS_IO_ENDPOINT sends every client to that endpoint instead of AWS –
+point it at `moto_server` or localstack to run the handlers offline.
+
+Env: AWS_IO_POOL      (connections per client, default 50)
+     AWS_IO_WORKERS   (gather() threads, default 32)
+     AWS_IO_ENDPOINT  (optional endpoint override for a local backend)
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+POOL = int(os.environ.get('AWS_IO_POOL', '50'))
+WORKERS = int(os.environ.get('AWS_IO_WORKERS', '32'))
+ENDPOINT = os.environ.get('AWS_IO_ENDPOINT') or None
+
+_session = None
+_cache = {}
+_lock = threading.Lock()
+
+# threads are only started as work is submitted
+executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='aws-io')
+
+
+class Lazy:
+    """Stands in for a client / resource / table until it is first used."""
+    __slots__ = ('_factory', '_obj', '_obj_lock')
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._obj = None
+        self._obj_lock = threading.Lock()
+
+    def _get(self):
+        if self._obj is None:
+            with self._obj_lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+def _session_and_config():
+    global _session
+    import boto3
+    from botocore.config import Config
+
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session, Config(
+        max_pool_connections=POOL,
+        tcp_keepalive=True,
+        retries={'mode': 'standard', 'max_attempts': 5},
+    )
+
+
+def _build(kind, service):
+    with _lock:
+        session, config = _session_and_config()
+        factory = session.client if kind == 'client' else session.resource
+        return factory(service, config=config, endpoint_url=ENDPOINT)
+
+
+def _shared(kind, service):
+    with _lock:
+        if (kind, service) not in _cache:
+            _cache[kind, service] = Lazy(lambda: _build(kind, service))
+        return _cache[kind, service]
+
+
+def client(service: str):
+    """Shared low-level client for `service`."""
+    return _shared('client', service)
+
+
+def resource(service: str):
+    """Shared boto3 resource for `service` (dynamodb)."""
+    return _shared('resource', service)
+
+
+def table(name: str):
+    return Lazy(lambda: resource('dynamodb').Table(name))
+
+
+def gather(*calls):
+    """
+    Run independent zero-argument calls concurrently; returns their results
+    in order. The first call runs on the calling thread. Every call finishes
+    before the first error (if any) is raised. Not for use from a task that
+    is itself running on `executor`.
+    """
+    if not calls:
+        return []
+    futures = [executor.submit(c) for c in calls[1:]]
+    try:
+        first = calls[0]()
+    finally:
+        wait(futures)
+    return [first] + [f.result() for f in futures]
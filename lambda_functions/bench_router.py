@@ -0,0 +1,93 @@
+"""
+Dispatch-latency benchmark for router.py.
+
+Replays a JSONL file of API Gateway (HTTP API v2) events – one per line,
+either full events or just {"method": …, "path": …} – through
+router.resolve() and reports per-route latency. Only route matching is
+timed; handlers are not run, so no AWS access is needed.
+
+    python bench_router.py events.jsonl [--repeat 2000] [--out bench_output.txt]
+
+Without a file a synthetic mix of the Wallet web-service calls is used.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+# router builds its clients at import; nothing is called on them here
+for _k, _v in (('AWS_DEFAULT_REGION', 'eu-west-2'), ('TABLE_PASSES', 'bench'),
+               ('TABLE_REG', 'bench'), ('BUCKET_PASSES', 'bench'),
+               ('TABLE_COUNTERS', 'bench')):
+    os.environ.setdefault(_k, _v)
+
+import router  # noqa: E402
+
+SAMPLE = [
+    ('POST', '/v1/devices/dev-1/registrations/pass.com.example/8c3f0e1a'),
+    ('DELETE', '/v1/devices/dev-1/registrations/pass.com.example/8c3f0e1a'),
+    ('GET', '/v1/devices/dev-1/registrations/pass.com.example'),
+    ('GET', '/v1/passes/pass.com.example/8c3f0e1a'),
+    ('GET', '/v1/passes/pass.com.example'),
+    ('POST', '/v1/log'),
+    ('GET', '/v1/unknown/route'),
+]
+
+
+def _load(path):
+    requests = []
+    with open(path) as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            ev = json.loads(line)
+            if 'requestContext' in ev:
+                requests.append((ev['requestContext']['http']['method'],
+                                 ev['rawPath'].split('?', 1)[0]))
+            else:
+                requests.append((ev['method'], ev['path']))
+    return requests
+
+
+def run(requests, repeat):
+    samples = defaultdict(list)
+    clock = time.perf_counter_ns
+    for _ in range(repeat):
+        for method, path in requests:
+            t0 = clock()
+            route = router.resolve(method, path)
+            elapsed = clock() - t0
+            samples[(method, route[0] if route else '<404>')].append(elapsed)
+    return samples
+
+
+def report(samples):
+    rows = [f"{'route':<66} {'n':>8} {'mean µs':>8} {'p50 µs':>8} {'p99 µs':>8}"]
+    for (method, template), ns in sorted(samples.items()):
+        ns.sort()
+        rows.append(f"{method + ' ' + template:<66} {len(ns):>8} "
+                    f"{statistics.fmean(ns) / 1000:>8.2f} "
+                    f"{ns[len(ns) // 2] / 1000:>8.2f} "
+                    f"{ns[int(len(ns) * 0.99)] / 1000:>8.2f}")
+    return '\n'.join(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    ap.add_argument('events', nargs='?', help='JSONL file of events')
+    ap.add_argument('--repeat', type=int, default=2000)
+    ap.add_argument('--out', help='also write the report to this file')
+    args = ap.parse_args()
+
+    requests = _load(args.events) if args.events else SAMPLE
+    text = report(run(requests, args.repeat))
+    print(text)
+    if args.out:
+        with open(args.out, 'w') as fh:
+            fh.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Content-addressed cache of signed .pkpass packages, per warm container.
+
+A package is keyed by what goes into it: the fingerprint of its contents
+(template_compiler.fingerprint – assets hash + canonical pass.json) and
+the versions of the signing credentials. Equal keys mean an equivalent
+signed package, so a build whose key has been seen before reuses the
+cached bytes instead of signing again. Entries live in a ByteLRU evicted
+by total size.
+
+pass.json carries the serial and auth token, so only a pass returning to
+earlier contents (A → B → A edits, a retried bulk / fixture chunk) can
+hit; the cache is deliberately memory-only, since an S3 tier would cost
+a GET and a PUT per build for that. A cert rotation changes every key,
+so nothing signed with the old certificate is served afterwards.
+
+Env: BUILD_CACHE_BYTES (budget, default 32 MiB)
+"""
+import hashlib
+import os
+import threading
+
+from lru import ByteLRU
+
+_memory = ByteLRU(int(os.environ.get('BUILD_CACHE_BYTES', str(32 * 1024 * 1024))))
+_builds = 0
+_lock = threading.Lock()
+
+
+def key(fingerprint: str, credential_versions) -> str:
+    versions = ','.join(str(v) for v in credential_versions)
+    return hashlib.sha256(f"{fingerprint}:{versions}".encode()).hexdigest()[:40]
+
+
+def signed(k: str, build) -> bytes:
+    """The package cached under key `k`, or build() it and cache it."""
+    global _builds
+    pkpass = _memory.get(k)
+    if pkpass is None:
+        pkpass = build()
+        with _lock:
+            _builds += 1
+        _memory.put(k, pkpass)
+    return pkpass
+
+
+def stats() -> dict:
+    """Hit / miss counters since the container started."""
+    return {**_memory.stats(), 'builds': _builds}
@@ -1,31 +1,97 @@
 """
-Scans Passes where emailStatus = pending and queues a PassMail job for each.
-Env: TABLE_PASSES, BUCKET_PASSES, MAIL_QUEUE_URL
+Queues a PassMail job for every pass with emailStatus = pending.
+
+Pending passes are read page by page from the emailStatus GSI, flipped to
+"queued" concurrently (conditional, so overlapping runs never mail twice)
+and enqueued with send_message_batch, ten per call. Close to the timeout
+the λ re-invokes itself with the last LastEvaluatedKey as its checkpoint,
+so arbitrarily large runs finish across invocations.
+Env: TABLE_PASSES, BUCKET_PASSES, MAIL_QUEUE_URL, TABLE_COUNTERS,
+     PASSES_STATUS_INDEX (emailStatus HASH, email RANGE), MAILER_WORKERS
 """
-import boto3
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+import aws_io
+import counters
+
+WORKERS = int(os.environ.get('MAILER_WORKERS', '16'))
+RESERVE_MS = 30000
 
-dynamo = boto3.resource('dynamodb')
-table = dynamo.Table(os.environ['TABLE_PASSES'])
-sqs = boto3.client('sqs')
+table = aws_io.table(os.environ['TABLE_PASSES'])
+sqs = aws_io.client('sqs')
+lambda_c = aws_io.client('lambda')
 
 QUEUE = os.environ['MAIL_QUEUE_URL']
 BUCKET = os.environ['BUCKET_PASSES']
+STATUS_INDEX = os.environ.get('PASSES_STATUS_INDEX', 'emailStatus-email-index')
+
+
+def _set_status(serial, old, new):
+    """Conditional status flip; False if the pass is no longer in `old`."""
+    try:
+        table.update_item(Key={'serialNumber': serial},
+                          UpdateExpression='SET emailStatus = :n',
+                          ConditionExpression='emailStatus = :o',
+                          ExpressionAttributeValues={':n': new, ':o': old})
+        return True
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False  # status moved on meanwhile (e.g. installed) – leave it
+
+
+def _enqueue(items):
+    """send_message_batch in groups of 10; returns the items SQS rejected."""
+    failed = []
+    for i in range(0, len(items), 10):
+        group = items[i:i + 10]
+        resp = sqs.send_message_batch(QueueUrl=QUEUE, Entries=[
+            {'Id': str(n),
+             'MessageBody': json.dumps({
+                 "email": item['email'],
+                 "serial": item['serialNumber'],
+                 "bucket": BUCKET,
+                 "key": f"{item['serialNumber']}.pkpass"
+             })}
+            for n, item in enumerate(group)
+        ])
+        failed.extend(group[int(f['Id'])] for f in resp.get('Failed', []))
+    return failed
+
+
+def lambda_handler(event, ctx):
+    from boto3.dynamodb.conditions import Key
+    event = event or {}
+    queued = int(event.get('queued', 0))
+    kwargs = {'IndexName': STATUS_INDEX,
+              'KeyConditionExpression': Key('emailStatus').eq('pending'),
+              'ProjectionExpression': 'serialNumber, email'}
+    if event.get('cursor'):
+        kwargs['ExclusiveStartKey'] = event['cursor']
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        while True:
+            page = table.query(**kwargs)
+            items = page['Items']
+
+            # claim first, then enqueue only what we claimed
+            claimed = [i for i, ok in zip(items, pool.map(
+                lambda i: _set_status(i['serialNumber'], 'pending', 'queued'), items)) if ok]
+            failed = _enqueue(claimed)
+            list(pool.map(lambda i: _set_status(i['serialNumber'], 'queued', 'pending'), failed))
+
+            counters.shift('pending', 'queued', len(claimed) - len(failed))
+            queued += len(claimed) - len(failed)
 
+            if 'LastEvaluatedKey' not in page:
+                break
+            kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+            if ctx and ctx.get_remaining_time_in_millis() < RESERVE_MS:
+                lambda_c.invoke(FunctionName=ctx.invoked_function_arn,
+                                InvocationType='Event',
+                                Payload=json.dumps({'cursor': kwargs['ExclusiveStartKey'],
+                                                    'queued': queued}).encode())
+                return {"statusCode": 202, "body": f"Queued {queued} passes so far, continuing"}
 
-def lambda_handler(event, _ctx):
-    scan = table.scan(FilterExpression='emailStatus = :p',
-                      ExpressionAttributeValues={':p': 'pending'})
-    for item in scan['Items']:
-        sqs.send_message(QueueUrl=QUEUE,
-                         MessageBody=json.dumps({
-                             "email": item['email'],
-                             "serial": item['serialNumber'],
-                             "bucket": BUCKET,
-                             "key": f"{item['serialNumber']}.pkpass"
-                         }))
-        table.update_item(Key={'serialNumber': item['serialNumber']},
-                          UpdateExpression='SET emailStatus = :q',
-                          ExpressionAttributeValues={':q': 'queued'})
-    return {"statusCode": 200, "body": f"Queued {scan['Count']} passes"}
+    return {"statusCode": 200, "body": f"Queued {queued} passes"}
@@ -0,0 +1,90 @@
+"""
+Cold-start profile of the Lambda handler modules.
+
+Each handler is imported in a fresh interpreter – the closest local stand-in
+for a new Lambda container – and two numbers are taken:
+
+    import  time to `import <module>` (module-level code included)
+    init    time to then build every AWS client / table the module holds,
+            i.e. what the first request pays on top of the import
+
+    python cold_start.py [module …] [--runs 7] [--out bench_output.txt]
+
+Only client construction is measured; no AWS call is made.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HANDLERS = ['router', 'admin_router', 'main', 'bulk_mailer', 'pass_mailer',
+            'push_dispatcher', 'template_routes', 'counters']
+
+ENV = {
+    'AWS_DEFAULT_REGION': 'eu-west-2',
+    'AWS_ACCESS_KEY_ID': 'profile', 'AWS_SECRET_ACCESS_KEY': 'profile',
+    'TABLE_PASSES': 'profile', 'TABLE_REG': 'profile', 'TABLE_REGS': 'profile',
+    'TABLE_COUNTERS': 'profile', 'TABLE_FIXTURES': 'profile',
+    'BUCKET_PASSES': 'profile',
+    'BUCKET_TEMPLATES': 'profile', 'MAIL_QUEUE_URL': 'profile',
+    'PUSH_QUEUE_URL': 'profile', 'BULK_MAILER_ARN': 'profile',
+    'FROM_EMAIL': 'profile@example.com',
+}
+
+PROBE = r'''
+import importlib, json, sys, time
+t0 = time.perf_counter()
+mod = importlib.import_module(sys.argv[1])
+t1 = time.perf_counter()
+import aws_io
+for value in list(vars(mod).values()):
+    if isinstance(value, aws_io.Lazy):
+        value.meta  # forces construction
+t2 = time.perf_counter()
+print(json.dumps({"import": (t1 - t0) * 1000, "init": (t2 - t1) * 1000}))
+'''
+
+
+def profile(module, runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    for k, v in ENV.items():
+        env.setdefault(k, v)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE, module], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return samples
+
+
+def report(results):
+    rows = [f"{'handler':<18} {'import p50':>11} {'import max':>11} "
+            f"{'init p50':>9} {'init max':>9} {'total p50':>10}   (ms)"]
+    for module, samples in results.items():
+        imp = [s['import'] for s in samples]
+        ini = [s['init'] for s in samples]
+        tot = [s['import'] + s['init'] for s in samples]
+        rows.append(f"{module:<18} {statistics.median(imp):>11.1f} {max(imp):>11.1f} "
+                    f"{statistics.median(ini):>9.1f} {max(ini):>9.1f} {statistics.median(tot):>10.1f}")
+    return '\n'.join(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    ap.add_argument('modules', nargs='*', default=HANDLERS)
+    ap.add_argument('--runs', type=int, default=7)
+    ap.add_argument('--out', help='also write the report to this file')
+    args = ap.parse_args()
+
+    text = report({m: profile(m, args.runs) for m in args.modules})
+    print(text)
+    if args.out:
+        with open(args.out, 'w') as fh:
+            fh.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Maintained pass counts per emailStatus, so /admin/metrics is one GetItem.
+
+Every writer that changes a pass's emailStatus calls shift(old, new); an
+ADD update keeps the counter item consistent under concurrent writers.
+reconcile() recounts the passes table (every page) and overwrites the
+item to repair drift – it doubles as this module's lambda_handler so an
+EventBridge schedule can run it.
+
+Env: TABLE_COUNTERS (HASH key `counter`), TABLE_PASSES
+"""
+import logging
+import os
+import time
+from collections import Counter
+
+import aws_io
+
+logger = logging.getLogger()
+
+table = aws_io.table(os.environ['TABLE_COUNTERS'])
+passes = aws_io.table(os.environ['TABLE_PASSES'])
+
+KEY = {'counter': 'emailStatus'}
+
+
+def shift(old, new, n=1):
+    """Move n passes from status `old` to `new` (either may be None)."""
+    if old == new or n <= 0:
+        return
+    parts, names, values = [], {}, {}
+    if old:
+        parts.append('#o :dec')
+        names['#o'] = old
+        values[':dec'] = -n
+    if new:
+        parts.append('#n :inc')
+        names['#n'] = new
+        values[':inc'] = n
+    table.update_item(
+        Key=KEY,
+        UpdateExpression='ADD ' + ', '.join(parts),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+    )
+
+
+def read() -> dict:
+    """{status: count} as last maintained / reconciled."""
+    item = table.get_item(Key=KEY).get('Item') or {}
+    return {k: int(v) for k, v in item.items() if k not in KEY and k != 'reconciledAt'}
+
+
+def reconcile() -> dict:
+    """Recount every pass by emailStatus and overwrite the counter item."""
+    counts = Counter()
+    kwargs = {'ProjectionExpression': 'emailStatus'}
+    while True:
+        resp = passes.scan(**kwargs)
+        counts.update(i['emailStatus'] for i in resp['Items'] if i.get('emailStatus'))
+        if 'LastEvaluatedKey' not in resp:
+            break
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+    table.put_item(Item={**KEY, **counts, 'reconciledAt': int(time.time() * 1000)})
+    logger.info("RECONCILED counters %s", dict(counts))
+    return dict(counts)
+
+
+def lambda_handler(_event, _ctx):
+    return {'statusCode': 200, 'body': str(reconcile())}
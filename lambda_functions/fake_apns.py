@@ -0,0 +1,132 @@
+"""
+Local fake of the APNs HTTP/2 provider API, for exercising push_dispatcher.py.
+
+Speaks TLS + HTTP/2 (via `h2`) and answers POST /3/device/{token} by the
+token's prefix, so one run covers every branch of the dispatcher:
+
+    gone…      410 {"reason": "Unregistered"}
+    bad…       400 {"reason": "BadDeviceToken"}
+    throttle…  429 {"reason": "TooManyRequests"}
+    fail…      500 {"reason": "InternalServerError"}
+    anything   200
+
+Every request is recorded as (token, apns-topic) in .requests.
+
+    python fake_apns.py --cert server.pem --key server.key [--port 8443]
+
+then run the dispatcher with APNS_HOST=https://127.0.0.1:8443 APNS_VERIFY=0.
+"""
+import argparse
+import json
+import socket
+import ssl
+import threading
+
+import h2.config
+import h2.connection
+import h2.events
+
+ANSWERS = (
+    ('gone', 410, 'Unregistered'),
+    ('bad', 400, 'BadDeviceToken'),
+    ('throttle', 429, 'TooManyRequests'),
+    ('fail', 500, 'InternalServerError'),
+)
+
+
+def answer(token):
+    """(status, reason) the fake gives for a device token."""
+    for prefix, status, reason in ANSWERS:
+        if token.startswith(prefix):
+            return status, reason
+    return 200, None
+
+
+class FakeAPNs:
+    def __init__(self, cert_path, key_path, host='127.0.0.1', port=0):
+        self._ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self._ctx.load_cert_chain(cert_path, key_path)
+        self._ctx.set_alpn_protocols(['h2'])
+        self._sock = socket.create_server((host, port))
+        self.url = f"https://{host}:{self._sock.getsockname()[1]}"
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:     # closed by stop()
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, raw):
+        try:
+            sock = self._ctx.wrap_socket(raw, server_side=True)
+        except (ssl.SSLError, OSError):
+            raw.close()
+            return
+        h2c = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        h2c.initiate_connection()
+        sock.sendall(h2c.data_to_send())
+        headers = {}
+        try:
+            while True:
+                data = sock.recv(65535)
+                if not data:
+                    break
+                for event in h2c.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        headers[event.stream_id] = {
+                            (k.decode() if isinstance(k, bytes) else k):
+                            (v.decode() if isinstance(v, bytes) else v)
+                            for k, v in event.headers
+                        }
+                    elif isinstance(event, h2.events.DataReceived):
+                        h2c.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        self._respond(h2c, event.stream_id, headers.pop(event.stream_id, {}))
+                sock.sendall(h2c.data_to_send())
+        except (ssl.SSLError, OSError):
+            pass
+        finally:
+            sock.close()
+
+    def _respond(self, h2c, stream_id, headers):
+        token = headers.get(':path', '').rsplit('/', 1)[-1]
+        with self._lock:
+            self.requests.append((token, headers.get('apns-topic')))
+        status, reason = answer(token)
+        body = json.dumps({'reason': reason}).encode() if reason else b''
+        h2c.send_headers(stream_id, [(':status', str(status)),
+                                     ('content-length', str(len(body)))],
+                         end_stream=not body)
+        if body:
+            h2c.send_data(stream_id, body, end_stream=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    ap.add_argument('--cert', required=True, help='server certificate (PEM)')
+    ap.add_argument('--key', required=True, help='server private key (PEM)')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8443)
+    args = ap.parse_args()
+
+    server = FakeAPNs(args.cert, args.key, args.host, args.port).start()
+    print(f"fake APNs listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,194 +3,181 @@ import hashlib
 import io
 import json
 import os
-import subprocess
-import tempfile
 import time
 import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import boto3
+import aws_io
+import counters
+import signer
+import template_cache
+import template_compiler
 
-# Make sure your OpenSSL layer is attached and on PATH
-os.environ['PATH'] = '/opt/bin:' + os.environ.get('PATH', '')
-OPENSSL = '/opt/bin/openssl'
+ISSUE_WORKERS = int(os.environ.get('ISSUE_WORKERS', '16'))
+ISSUE_BATCH_MAX = int(os.environ.get('ISSUE_BATCH_MAX', '500'))
 
-s3 = boto3.client('s3')
-dynamo = boto3.resource('dynamodb')
-passes = dynamo.Table(os.environ['TABLE_PASSES'])
-sqs = boto3.client('sqs')
-ssm = boto3.client('ssm')
+s3 = aws_io.client('s3')
+passes = aws_io.table(os.environ['TABLE_PASSES'])
+sqs = aws_io.client('sqs')
 
-BUCKET_TPL = os.environ['BUCKET_TEMPLATES']
 BUCKET_OUT = os.environ['BUCKET_PASSES']
 MAIL_QUEUE = os.environ['MAIL_QUEUE_URL']
-CERT_PARAM = '/passkit/cert'
-CERT_PASS_PARAM = '/passkit/certPass'
+PASS_TYPE = "pass.uk.co.mk-lightning.season-ticket"
+WEB_SERVICE_URL = "https://bnlji95zgg.execute-api.eu-west-2.amazonaws.com"
 
 
-def _run_openssl(args, input_bytes=None):
-    """Run openssl with args list, capture stderr, raise on error with diagnostics."""
-    proc = subprocess.run(
-        [OPENSSL] + args,
-        input=input_bytes,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    if proc.returncode != 0:
-        raise RuntimeError(
-            f"openssl {' '.join(args)} failed (exit {proc.returncode}):\n"
-            f"{proc.stderr.decode().strip()}"
-        )
-    return proc.stdout
-
-
-def _sign_pass_openssl(files: dict) -> bytes:
-    # 1) Build manifest.json
+def _sign_pass_openssl(files: dict, digests: dict = None) -> bytes:
+    # 1) Build manifest.json (reuse known SHA-1s, hash only the rest)
+    digests = digests or {}
     manifest = {
-        name: hashlib.sha1(data).hexdigest()
+        name: digests.get(name) or hashlib.sha1(data).hexdigest()
         for name, data in files.items()
     }
     manifest_bytes = json.dumps(manifest, separators=(',', ':'), sort_keys=True).encode()
     files['manifest.json'] = manifest_bytes
 
-    # 2) Get your PKCS#12 bundle from SSM
-    p12_b64 = ssm.get_parameter(Name=CERT_PARAM, WithDecryption=True)['Parameter']['Value']
-    p12_pass = ssm.get_parameter(Name=CERT_PASS_PARAM, WithDecryption=True)['Parameter']['Value']
-    p12_bytes = base64.b64decode(p12_b64)
-
-    with tempfile.TemporaryDirectory() as td:
-        p12_path = os.path.join(td, 'bundle.p12')
-        cert_path = os.path.join(td, 'cert.pem')
-        key_path = os.path.join(td, 'key.pem')
-        sig_path = os.path.join(td, 'signature')
-
-        # write the .p12 file
-        with open(p12_path, 'wb') as f:
-            f.write(p12_bytes)
-
-        # 3a) Extract only the client cert (no keys) with -clcerts
-        _run_openssl([
-            'pkcs12',
-            '-in', p12_path,
-            '-clcerts',  # only the client certificate
-            '-nokeys',
-            '-passin', f'pass:{p12_pass}',
-            '-out', cert_path
-        ])
-
-        # 3b) Extract only the private key
-        _run_openssl([
-            'pkcs12',
-            '-in', p12_path,
-            '-nocerts',
-            '-nodes',
-            '-passin', f'pass:{p12_pass}',
-            '-out', key_path
-        ])
-
-        # 4) Sign manifest.json → DER signature
-        #    Make sure AppleWWDRCA.pem is in your code root
-        _run_openssl([
-            'smime',
-            '-binary',
-            '-sign',
-            '-in', '/dev/stdin',
-            '-signer', cert_path,
-            '-inkey', key_path,
-            '-certfile', os.path.join(os.getcwd(), 'AppleWWDR.pem'),
-            '-outform', 'DER',
-            '-out', sig_path,
-            '-md', 'sha1',
-        ], input_bytes=manifest_bytes)
-
-        # 5) Build .pkpass
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-            for fname, fdata in files.items():
-                zf.writestr(fname, fdata)
-            with open(sig_path, 'rb') as sf:
-                zf.writestr('signature', sf.read())
-        return buf.getvalue()
+    # 2) Sign manifest.json → DER signature (engine chosen by PASS_SIGNER)
+    signature = signer.sign_manifest(manifest_bytes)
 
+    # 3) Build .pkpass
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for fname, fdata in files.items():
+            zf.writestr(fname, fdata)
+        zf.writestr('signature', signature)
+    return buf.getvalue()
 
-def lambda_handler(event, _ctx):
-    body = json.loads(event['body'])
-    email = body['email']
-    member = body.get('memberId', 'unknown')
 
+def _build_one(tpl, record: dict, now_ms: int):
+    """Build and sign one pass; returns (DynamoDB row, .pkpass bytes)."""
     serial = str(uuid.uuid4())
     auth = base64.urlsafe_b64encode(os.urandom(16)).decode()
-    now_ms = int(time.time() * 1000)
 
-    # Load template.zip once per cold start
-    global TEMPLATE_ZIP
-    if 'TEMPLATE_ZIP' not in globals():
-        obj = s3.get_object(Bucket=BUCKET_TPL, Key='template.zip')
-        TEMPLATE_ZIP = obj['Body'].read()
-
-    # Populate template
-    tpl_files = {}
-    pass_json_path = None
-
-    with zipfile.ZipFile(io.BytesIO(TEMPLATE_ZIP)) as z:
-        # find all real file entries (skip directories)
-        file_names = [n for n in z.namelist() if not n.endswith('/')]
-        # detect a common top-level prefix (like "template/")
-        common_prefix = os.path.commonprefix(file_names)
-        if common_prefix and '/' in common_prefix:
-            # ensure we cut at a slash boundary
-            common_prefix = common_prefix.split('/', 1)[0] + '/'
-        else:
-            common_prefix = ''
-
-        # now read & re-key each file without that prefix
-        for full_name in file_names:
-            data = z.read(full_name)
-            name = full_name[len(common_prefix):] if full_name.startswith(common_prefix) else full_name
-
-            # patch pass.json when we hit it
-            if name.lower().endswith('pass.json'):
-                pass_json_path = name
-                j = json.loads(data)
-                j.update(body.get('passData', {}))
-                j.update({
-                    "serialNumber": serial,
-                    "authenticationToken": auth,
-                    "webServiceURL": "https://bnlji95zgg.execute-api.eu-west-2.amazonaws.com"
-                })
-                data = json.dumps(j, separators=(',', ':'), sort_keys=True).encode()
-
-            tpl_files[name] = data
-
-    if pass_json_path is None:
-        raise RuntimeError("template.zip didn’t contain a pass.json")
+    # Patch pass.json on top of the cached template index
+    pass_json = tpl.render(record.get('passData', {}), {
+        "serialNumber": serial,
+        "authenticationToken": auth,
+        "webServiceURL": WEB_SERVICE_URL
+    })
+    files = dict(tpl.files)
+    files[tpl.pass_json_name] = pass_json
 
     # Sign & zip
-    pkpass = _sign_pass_openssl(tpl_files)
+    pkpass = _sign_pass_openssl(files, tpl.digests)
 
-    # Upload
-    key = f"{serial}.pkpass"
+    row = {
+        "serialNumber": serial,
+        "email": record['email'],
+        "auth": auth,
+        "lastModified": now_ms,
+        "emailStatus": "pending",
+        "passData": pass_json.decode(),
+        "passTypeIdentifier": PASS_TYPE,
+        # lets admin edits that change nothing skip the rebuild (admin_router)
+        "assetsHash": tpl.assets_hash,
+        "fingerprint": template_compiler.fingerprint(tpl.assets_hash, pass_json),
+    }
+    if record.get('memberId'):
+        row["memberId"] = record['memberId']
+    return row, pkpass
+
+
+def _upload(serial: str, pkpass: bytes):
     s3.put_object(
         Bucket=BUCKET_OUT,
-        Key=key,
+        Key=f"{serial}.pkpass",
         Body=pkpass,
         ContentType='application/vnd.apple.pkpass'
     )
 
-    # Store in DynamoDB
-    passes.put_item(Item={
-        "serialNumber": serial,
-        "email": email,
-        "auth": auth,
-        "lastModified": now_ms,
-        "emailStatus": "pending",
-        # decode the patched JSON from the correct key
-        "passData": tpl_files[pass_json_path].decode(),
-        "passTypeIdentifier": "pass.uk.co.mk-lightning.season-ticket",
-    })
+
+def _issue_one(tpl, record: dict, now_ms: int) -> dict:
+    """Build, sign and upload one pass; returns its DynamoDB row."""
+    row, pkpass = _build_one(tpl, record, now_ms)
+    _upload(row['serialNumber'], pkpass)
+    return row
+
+
+def issue_passes(records: list) -> list:
+    """
+    Issue many passes in one go: one template, one set of credentials,
+    signing + upload on a thread pool, rows written with batch_writer.
+    Returns one result per input record, in input order.
+    """
+    tpl = template_cache.get()
+    signer.credentials()    # load once before the workers fan out
+    now_ms = int(time.time() * 1000)
+
+    results = [None] * len(records)
+    rows = []
+    with ThreadPoolExecutor(max_workers=ISSUE_WORKERS) as pool:
+        futures = {}
+        for i, rec in enumerate(records):
+            if not isinstance(rec, dict) or not rec.get('email'):
+                results[i] = {"index": i, "ok": False, "error": "missing email"}
+                continue
+            futures[pool.submit(_issue_one, tpl, rec, now_ms)] = i
+
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                row = fut.result()
+            except Exception as e:
+                results[i] = {"index": i, "ok": False, "error": str(e)}
+                continue
+            rows.append(row)
+            results[i] = {"index": i, "ok": True, "email": row['email'],
+                          "serialNumber": row['serialNumber'], "auth": row['auth']}
+
+    with passes.batch_writer() as bw:
+        for row in rows:
+            bw.put_item(Item=row)
+    counters.shift(None, 'pending', len(rows))
+    return results
+
+
+def _create_passes(body):
+    records = body.get('records') if isinstance(body, dict) else body
+    if not isinstance(records, list):
+        return {"statusCode": 400, "body": json.dumps({"message": "Expected a list of records"})}
+    if len(records) > ISSUE_BATCH_MAX:
+        return {"statusCode": 413,
+                "body": json.dumps({"message": f"At most {ISSUE_BATCH_MAX} records per call"})}
+
+    results = issue_passes(records)
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps({
+            "created": sum(1 for r in results if r['ok']),
+            "failed": sum(1 for r in results if not r['ok']),
+            "results": results,
+        })
+    }
+
+
+def lambda_handler(event, _ctx):
+    body = json.loads(event['body'])
+    if event.get('rawPath', '').endswith('/createPasses'):
+        return _create_passes(body)
+
+    row, pkpass = _build_one(template_cache.get(), body, int(time.time() * 1000))
+
+    # Upload and store in DynamoDB – independent, so side by side; a row
+    # must never outlive a failed upload (bulk_mailer would mail a dead link)
+    try:
+        aws_io.gather(
+            lambda: _upload(row['serialNumber'], pkpass),
+            lambda: passes.put_item(Item=row),
+        )
+    except Exception:
+        passes.delete_item(Key={"serialNumber": row['serialNumber']})
+        raise
+    counters.shift(None, 'pending')
 
     return {
         "statusCode": 200,
         "headers": {"Content-Type": "application/json"},
-        "body": json.dumps({"serialNumber": serial, "auth": auth})
+        "body": json.dumps({"serialNumber": row['serialNumber'], "auth": row['auth']})
     }
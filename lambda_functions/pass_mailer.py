@@ -1,31 +1,72 @@
-import boto3
+"""
+Mails the download link for each PassMail job in an SQS batch.
+
+All records of the batch are handled concurrently; SES calls go through a
+module-level token bucket – it outlives the invocation, so back-to-back
+batches on a warm container share it – that paces sends to the account's
+per-second quota with no burst. Only the
+messages that failed are reported back (batchItemFailures), so SQS retries
+just those – the event source mapping needs ReportBatchItemFailures.
+Env: TABLE_PASSES, BUCKET_PASSES, FROM_EMAIL, TABLE_COUNTERS,
+     SES_MAX_SEND_RATE (mails / second, default 14), MAILER_WORKERS (default 10)
+"""
 import json
+import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aws_io
+import counters
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
 
-s3 = boto3.client('s3')
-ses = boto3.client('ses')
-ddb = boto3.resource('dynamodb')
-passes = ddb.Table(os.environ['TABLE_PASSES'])
+WORKERS = int(os.environ.get('MAILER_WORKERS', '10'))
+SEND_RATE = float(os.environ.get('SES_MAX_SEND_RATE', '14'))
+
+s3 = aws_io.client('s3')
+ses = aws_io.client('ses')
+passes = aws_io.table(os.environ['TABLE_PASSES'])
 FROM_EMAIL = os.environ['FROM_EMAIL']
 
 BUCKET_OUT = os.environ['BUCKET_PASSES']
 
 
-def lambda_handler(event, _ctx):
-    # assume single message per invocation
-    msg = json.loads(event['Records'][0]['body'])
+class RateLimiter:
+    """Token bucket shared by every worker thread of this container."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = 0.0           # start empty: a fresh container gets no burst
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# lives as long as the container, so warm invocations share one send budget
+limiter = RateLimiter(SEND_RATE)
+
+
+def _mail(msg, presigned_url, limiter):
     email = msg['email']
     serial = msg['serial']
 
-    # 1️⃣ generate a time-limited download link
-    presigned_url = s3.generate_presigned_url(
-        'get_object',
-        Params={'Bucket': BUCKET_OUT, 'Key': f"{serial}.pkpass"},
-        ExpiresIn=3600  # 1 hour
-    )
-
     # 2️⃣ send the link in an HTML email
+    limiter.acquire()
     ses.send_email(
         Source=FROM_EMAIL,
         Destination={'ToAddresses': [email]},
@@ -45,17 +86,46 @@ def lambda_handler(event, _ctx):
     )
 
     # 3️⃣ update DynamoDB so frontend sees “queued” (or “sent”)
-    passes.update_item(
+    old = passes.update_item(
         Key={'serialNumber': serial},
         UpdateExpression="SET emailStatus = :s, lastModified = :t",
         ExpressionAttributeValues={
             ':s': 'Mailed',
             ':t': int(time.time() * 1000)
-        }
-    )
+        },
+        ReturnValues='UPDATED_OLD',
+    ).get('Attributes', {})
+    counters.shift(old.get('emailStatus'), 'Mailed')
+
+
+def lambda_handler(event, _ctx):
+    records = event.get('Records', [])
+    failures = []
+
+    # 1️⃣ generate the time-limited download links up front (local signing, no I/O)
+    jobs = []
+    for rec in records:
+        try:
+            msg = json.loads(rec['body'])
+            url = s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': BUCKET_OUT, 'Key': f"{msg['serial']}.pkpass"},
+                ExpiresIn=3600  # 1 hour
+            )
+        except (KeyError, TypeError, json.JSONDecodeError):
+            # redelivery cannot fix a bad body – drop it rather than retry it
+            logger.exception("Dropping unreadable PassMail message %s", rec.get('messageId'))
+            continue
+        jobs.append((rec['messageId'], msg, url))
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {pool.submit(_mail, msg, url, limiter): mid for mid, msg, url in jobs}
+        for fut, mid in futures.items():
+            try:
+                fut.result()
+            except Exception:
+                logger.exception("Mailing failed for message %s", mid)
+                failures.append(mid)
 
-    return {
-        "statusCode": 200,
-        "headers": {"Access-Control-Allow-Origin": "*"},
-        "body": json.dumps({'message': 'email sent'})
-    }
+    logger.info("Mailed %d of %d", len(jobs) - len(failures), len(records))
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in failures]}
@@ -0,0 +1,93 @@
+"""
+Minimal ZIP writer that can copy already-compressed entries verbatim.
+
+zipfile can only add entries by (re)compressing them. For a .pkpass edit
+almost every entry is unchanged, so Writer.add_raw() copies the old
+compressed bytes and CRC straight across and only new content goes
+through zlib. No ZIP64 – passes are far below 4 GB.
+"""
+import io
+import struct
+import time
+import zipfile
+import zlib
+
+_LOCAL = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END = struct.Struct('<IHHHHIIH')
+_UTF8 = 0x800
+
+
+class RawEntry:
+    """One member of an existing archive, still compressed."""
+    __slots__ = ('name', 'method', 'crc', 'file_size', 'data')
+
+    def __init__(self, name, method, crc, file_size, data):
+        self.name = name
+        self.method = method
+        self.crc = crc
+        self.file_size = file_size
+        self.data = data
+
+    def read(self) -> bytes:
+        if self.method == zipfile.ZIP_STORED:
+            return self.data
+        if self.method == zipfile.ZIP_DEFLATED:
+            return zlib.decompress(self.data, -15)
+        raise ValueError(f"unsupported compression {self.method} for {self.name}")
+
+
+def read_entries(zip_bytes: bytes) -> dict:
+    """name → RawEntry for every file in the archive (directories skipped)."""
+    out = {}
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            hdr = _LOCAL.unpack_from(zip_bytes, info.header_offset)
+            start = info.header_offset + _LOCAL.size + hdr[9] + hdr[10]
+            out[info.filename] = RawEntry(
+                info.filename, info.compress_type, info.CRC, info.file_size,
+                zip_bytes[start:start + info.compress_size],
+            )
+    return out
+
+
+class Writer:
+    def __init__(self, level=6):
+        self.level = level
+        self._parts = []
+        self._central = []
+        self._offset = 0
+        t = time.localtime()
+        self._dostime = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+        self._dosdate = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+    def add(self, name: str, data: bytes):
+        """Deflate and append new content."""
+        c = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        comp = c.compress(data) + c.flush()
+        self._append(name, zipfile.ZIP_DEFLATED, zlib.crc32(data), len(data), comp)
+
+    def add_raw(self, entry: RawEntry, name: str = None):
+        """Append an entry copied from another archive without recompressing."""
+        self._append(name or entry.name, entry.method, entry.crc, entry.file_size, entry.data)
+
+    def _append(self, name, method, crc, size, comp):
+        fname = name.encode('utf-8')
+        flags = 0 if fname.isascii() else _UTF8
+        local = _LOCAL.pack(0x04034b50, 20, flags, method, self._dostime, self._dosdate,
+                            crc, len(comp), size, len(fname), 0)
+        self._central.append(_CENTRAL.pack(
+            0x02014b50, 0x0314, 20, flags, method, self._dostime, self._dosdate,
+            crc, len(comp), size, len(fname), 0, 0, 0, 0, 0o100644 << 16, self._offset,
+        ) + fname)
+        self._parts += (local, fname, comp)
+        self._offset += len(local) + len(fname) + len(comp)
+
+    def getvalue(self) -> bytes:
+        cd = b''.join(self._central)
+        end = _END.pack(0x06054b50, 0, 0, len(self._central), len(self._central),
+                        len(cd), self._offset, 0)
+        return b''.join(self._parts) + cd + end
+
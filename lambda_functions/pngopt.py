@@ -0,0 +1,140 @@
+"""
+Lossless PNG optimisation for template images, stdlib only.
+
+optimise() drops metadata chunks (text, timestamps, EXIF, physical size …)
+but keeps everything that affects how the image renders, and recompresses
+the image data at zlib level 9 – kept only if that is actually smaller.
+Pixels are untouched. check_variants() checks the @1x/@2x/@3x family of
+every image in a template by reading the IHDR of each.
+"""
+import re
+import struct
+import zlib
+
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# ancillary chunks that change rendering; everything else ancillary is metadata
+KEEP = {b'tRNS', b'sRGB', b'gAMA', b'cHRM', b'iCCP', b'sBIT'}
+# animated PNG – leave alone
+ANIMATED = {b'acTL', b'fcTL', b'fdAT'}
+
+# Wallet's largest size (points, @1x) per image – see Apple's pass design guide
+MAX_POINTS = {
+    'icon': (38, 38),
+    'logo': (160, 50),
+    'strip': (375, 144),
+    'thumbnail': (90, 90),
+    'background': (180, 220),
+    'footer': (286, 15),
+}
+
+_VARIANT = re.compile(r'^(?P<base>.+?)(?:@(?P<scale>[23])x)?\.png$', re.IGNORECASE)
+
+
+class PNGError(ValueError):
+    pass
+
+
+def _chunks(data: bytes):
+    if not data.startswith(SIGNATURE):
+        raise PNGError("not a PNG file")
+    pos = len(SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            raise PNGError("truncated PNG")
+        length, ctype = struct.unpack_from('>I4s', data, pos)
+        body = data[pos + 8:pos + 8 + length]
+        crc = data[pos + 8 + length:pos + 12 + length]
+        if len(body) != length or len(crc) != 4:
+            raise PNGError("truncated PNG")
+        if struct.unpack('>I', crc)[0] != zlib.crc32(ctype + body):
+            raise PNGError(f"bad CRC in {ctype.decode('latin-1')} chunk")
+        yield ctype, body
+        pos += 12 + length
+        if ctype == b'IEND':
+            return
+    raise PNGError("PNG has no IEND chunk")
+
+
+def _chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack('>I', len(body)) + ctype + body + struct.pack('>I', zlib.crc32(ctype + body))
+
+
+def dimensions(data: bytes):
+    """(width, height) from the IHDR chunk."""
+    if len(data) < 24 or not data.startswith(SIGNATURE) or data[12:16] != b'IHDR':
+        raise PNGError("not a PNG file")
+    return struct.unpack('>II', data[16:24])
+
+
+def optimise(data: bytes):
+    """PNG bytes → (optimised bytes, info dict). Raises PNGError on a bad PNG."""
+    chunks = list(_chunks(data))
+    if not chunks or chunks[0][0] != b'IHDR':
+        raise PNGError("PNG does not start with IHDR")
+    width, height = struct.unpack('>II', chunks[0][1][:8])
+    info = {'width': width, 'height': height, 'before': len(data)}
+    if any(c in ANIMATED for c, _ in chunks):
+        info['after'] = len(data)
+        return data, info
+
+    idat = b''.join(body for ctype, body in chunks if ctype == b'IDAT')
+    try:
+        raw = zlib.decompress(idat)
+    except zlib.error as e:
+        raise PNGError(f"corrupt image data: {e}")
+    best = idat
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        c = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        packed = c.compress(raw) + c.flush()
+        if len(packed) < len(best):
+            best = packed
+
+    out = [SIGNATURE]
+    wrote_idat = False
+    for ctype, body in chunks:
+        if ctype == b'IDAT':
+            if not wrote_idat:
+                out.append(_chunk(b'IDAT', best))
+                wrote_idat = True
+        elif ctype[0:1].isupper() or ctype in KEEP:   # critical, or affects rendering
+            out.append(_chunk(ctype, body))
+    result = b''.join(out)
+    if len(result) >= len(data):
+        result = data
+    info['after'] = len(result)
+    return result, info
+
+
+def check_variants(files: dict) -> list:
+    """
+    Warnings about the @1x/@2x/@3x images in {name: bytes}: missing base
+    image, @2x / @3x not exactly 2× / 3× the base, base larger than Wallet
+    shows.
+    """
+    families = {}
+    for name, data in files.items():
+        m = _VARIANT.match(name.rsplit('/', 1)[-1])
+        if not m:
+            continue
+        prefix = name[:len(name) - len(m.group(0))]
+        try:
+            size = dimensions(data)
+        except PNGError:
+            continue
+        families.setdefault(prefix + m.group('base'), {})[int(m.group('scale') or 1)] = size
+
+    warnings = []
+    for base, sizes in sorted(families.items()):
+        if 1 not in sizes:
+            warnings.append(f"{base}.png is missing (only @{'x, @'.join(map(str, sorted(sizes)))}x)")
+            continue
+        w, h = sizes[1]
+        for scale in (2, 3):
+            if scale in sizes and sizes[scale] != (w * scale, h * scale):
+                sw, sh = sizes[scale]
+                warnings.append(f"{base}@{scale}x.png is {sw}×{sh}, expected {w * scale}×{h * scale}")
+        limit = MAX_POINTS.get(base.rsplit('/', 1)[-1].lower())
+        if limit and (w > limit[0] or h > limit[1]):
+            warnings.append(f"{base}.png is {w}×{h}, larger than Wallet's {limit[0]}×{limit[1]}")
+    return warnings
@@ -0,0 +1,154 @@
+"""
+Sends the Wallet "pass changed" pushes to APNs.
+
+Consumes PUSH_QUEUE_URL messages of the form
+    {"pushes": [{"token": …, "device": …, "passType": …}, …]}
+Pushes go out over a persistent HTTP/2 connection pool (kept across warm
+invocations) authenticated with the pass type certificate from signer.py,
+many streams per connection with bounded concurrency. A 410 / BadDeviceToken
+/ Unregistered answer removes that token's registrations from TABLE_REGS.
+Messages with throttled or failed pushes come back as batchItemFailures so
+SQS retries only those (a repeated push is harmless – Wallet just re-polls).
+
+Env: TABLE_REGS,
+     APNS_HOST         (default https://api.push.apple.com; point it at a
+                        local fake APNs server for testing)
+     APNS_VERIFY       (0 skips TLS verification of APNS_HOST – fakes only)
+     APNS_CONCURRENCY  (in-flight pushes, default 64)
+     APNS_CONNECTIONS  (HTTP/2 connections, default 4)
+Needs httpx[http2] in the deployment package.
+"""
+import json
+import logging
+import os
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+import aws_io
+import signer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+regs = aws_io.table(os.environ['TABLE_REGS'])
+
+APNS_HOST = os.environ.get('APNS_HOST', 'https://api.push.apple.com')
+APNS_VERIFY = os.environ.get('APNS_VERIFY', '1') != '0'
+APNS_CONCURRENCY = int(os.environ.get('APNS_CONCURRENCY', '64'))
+APNS_CONNECTIONS = int(os.environ.get('APNS_CONNECTIONS', '4'))
+
+# reasons after which the token will never work again
+GONE_REASONS = ('BadDeviceToken', 'Unregistered', 'ExpiredToken')
+
+_client = None
+_client_versions = None
+_lock = threading.Lock()
+
+
+def _apns():
+    """Shared HTTP/2 client; rebuilt only when the certificate rotates."""
+    global _client, _client_versions
+    if httpx is None:
+        raise RuntimeError("push dispatcher needs the 'httpx[http2]' package")
+    creds = signer.credentials()
+    with _lock:
+        if _client is None or _client_versions != creds.versions:
+            ctx = ssl.create_default_context()
+            if not APNS_VERIFY:
+                ctx.check_hostname = False
+                ctx.verify_mode = ssl.CERT_NONE
+            ctx.load_cert_chain(*creds.pem_paths())
+            old = _client
+            _client = httpx.Client(
+                http2=True,
+                verify=ctx,
+                base_url=APNS_HOST,
+                timeout=10,
+                limits=httpx.Limits(max_connections=APNS_CONNECTIONS,
+                                    max_keepalive_connections=APNS_CONNECTIONS),
+            )
+            _client_versions = creds.versions
+            if old is not None:
+                old.close()
+        return _client
+
+
+def _send(client, push):
+    """One push → 'ok' | 'gone' | 'retry'."""
+    try:
+        resp = client.post(
+            f"/3/device/{push['token']}",
+            content=b'{}',
+            headers={'apns-topic': push['passType']},
+        )
+    except httpx.HTTPError as e:
+        logger.warning("APNs transport error for %s: %s", push['device'], e)
+        return 'retry'
+
+    if resp.status_code == 200:
+        return 'ok'
+    try:
+        reason = resp.json().get('reason', '')
+    except ValueError:
+        reason = ''
+    if resp.status_code == 410 or reason in GONE_REASONS:
+        return 'gone'
+    if resp.status_code == 429 or resp.status_code >= 500:
+        return 'retry'
+    # any other 4xx will not get better on retry
+    logger.warning("APNs rejected push for %s: %s %s", push['device'], resp.status_code, reason)
+    return 'ok'
+
+
+def _forget(push):
+    """Drop every registration of this device that still uses the dead token."""
+    from boto3.dynamodb.conditions import Key
+    kwargs = {
+        'KeyConditionExpression': Key('deviceLibraryIdentifier').eq(push['device']),
+        'ProjectionExpression': 'deviceLibraryIdentifier, serialNumber, pushToken',
+    }
+    while True:
+        resp = regs.query(**kwargs)
+        for item in resp.get('Items', []):
+            if item.get('pushToken') == push['token']:
+                regs.delete_item(Key={
+                    'deviceLibraryIdentifier': item['deviceLibraryIdentifier'],
+                    'serialNumber': item['serialNumber'],
+                })
+        if 'LastEvaluatedKey' not in resp:
+            break
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    logger.info("UNREGISTERED dead token device=%s", push['device'])
+
+
+def lambda_handler(event, _ctx):
+    jobs = []
+    for rec in event.get('Records', []):
+        try:
+            pushes = json.loads(rec['body'])['pushes']
+        except (KeyError, TypeError, json.JSONDecodeError):
+            logger.error("Dropping unreadable push message %s", rec.get('messageId'))
+            continue
+        jobs.extend((rec['messageId'], p) for p in pushes)
+
+    client = _apns()
+    with ThreadPoolExecutor(max_workers=APNS_CONCURRENCY) as pool:
+        results = list(pool.map(lambda job: _send(client, job[1]), jobs))
+
+    failed = set()
+    for (mid, push), result in zip(jobs, results):
+        if result == 'gone':
+            _forget(push)
+        elif result == 'retry':
+            failed.add(mid)
+
+    logger.info("PUSHED ok=%d gone=%d retry=%d",
+                results.count('ok'), results.count('gone'), results.count('retry'))
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in failed]}
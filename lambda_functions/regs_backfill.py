@@ -0,0 +1,50 @@
+"""
+One-off backfill of the registrations `typeUpdated` sort key.
+
+router.py lists a device's registrations through the
+(deviceLibraryIdentifier, typeUpdated) GSI; rows written before that
+attribute existed are invisible to it. Run this once after creating the
+index – it scans every page and sets typeUpdated where it is missing.
+Safe to re-run.
+
+Env: TABLE_REGS
+"""
+import logging
+import os
+
+import aws_io
+import regs_keys
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+regs = aws_io.table(os.environ['TABLE_REGS'])
+
+
+def backfill():
+    kwargs = {'ProjectionExpression':
+              'deviceLibraryIdentifier, serialNumber, passTypeIdentifier, updatedAt, typeUpdated'}
+    fixed = 0
+    while True:
+        resp = regs.scan(**kwargs)
+        for item in resp.get('Items', []):
+            if 'typeUpdated' in item or 'passTypeIdentifier' not in item:
+                continue
+            ts = int(item.get('updatedAt', 0))
+            regs.update_item(
+                Key={'deviceLibraryIdentifier': item['deviceLibraryIdentifier'],
+                     'serialNumber': item['serialNumber']},
+                UpdateExpression='SET typeUpdated = :k, updatedAt = if_not_exists(updatedAt, :t)',
+                ExpressionAttributeValues={':k': regs_keys.type_updated(item['passTypeIdentifier'], ts),
+                                           ':t': ts},
+            )
+            fixed += 1
+        if 'LastEvaluatedKey' not in resp:
+            break
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    logger.info("BACKFILLED typeUpdated on %d registrations", fixed)
+    return fixed
+
+
+def lambda_handler(_event, _ctx):
+    return {'statusCode': 200, 'body': f"Backfilled {backfill()} registrations"}
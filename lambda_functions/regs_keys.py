@@ -0,0 +1,15 @@
+"""
+Key formats of the registrations table, shared by every writer and reader.
+
+    typeUpdated   "{passTypeIdentifier}#{updatedAt:013d}" – sort key of the
+                  (deviceLibraryIdentifier, typeUpdated) GSI router.py lists
+                  a device's updated passes by
+
+router.py, admin_router.py and regs_backfill.py all build it here: a copy
+that drifts would make the key-range listing silently miss rows.
+"""
+
+
+def type_updated(pass_type, ts):
+    """Composite regs sort key; zero-padded so string order is time order."""
+    return f"{pass_type}#{int(ts):013d}"
@@ -4,20 +4,41 @@ import logging
 import os
 import re
 import time
-from decimal import Decimal
+from urllib.parse import unquote
 
-import boto3
-from boto3.dynamodb.conditions import Attr, Key
+
+import aws_io
+import counters
+from lru import ByteLRU
+from regs_keys import type_updated
 
 # ─── setup ─────────────────────────────────────────────────────────────────────
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client('s3')
-dynamo = boto3.resource('dynamodb')
-passes = dynamo.Table(os.environ['TABLE_PASSES'])
-regs = dynamo.Table(os.environ['TABLE_REG'])
+s3 = aws_io.client('s3')
+passes = aws_io.table(os.environ['TABLE_PASSES'])
+regs = aws_io.table(os.environ['TABLE_REG'])
 BUCKET = os.environ['BUCKET_PASSES']
+# GSI: passTypeIdentifier HASH, lastModified RANGE
+PASSES_UPDATED_INDEX = os.environ.get('PASSES_UPDATED_INDEX', 'passType-lastModified-index')
+# regs GSI: deviceLibraryIdentifier HASH, typeUpdated RANGE ("{passType}#{updatedAt:013d}")
+REGS_TYPE_INDEX = os.environ.get('REGS_TYPE_INDEX', 'device-typeUpdated-index')
+
+# how changed passes reach the device:
+#   inline   – base64 body from Lambda, hot passes kept in an in-memory LRU
+#   redirect – 302 to a short-lived presigned S3 URL
+#   cdn      – 302 to PASS_CDN_BASE/{serial}.pkpass?v={lastModified} (edge-cacheable)
+PASS_DELIVERY = os.environ.get('PASS_DELIVERY', 'inline')
+PASS_URL_TTL = int(os.environ.get('PASS_URL_TTL', '60'))
+PASS_CDN_BASE = os.environ.get('PASS_CDN_BASE', '').rstrip('/')
+_pass_cache = ByteLRU(int(os.environ.get('PASS_CACHE_BYTES', str(64 * 1024 * 1024))))
+
+# serial → (expires, passTypeIdentifier, auth); auth tokens never change, the
+# TTL only bounds how long a deleted pass keeps authorising
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', '60'))
+AUTH_CACHE_MAX = 50000
+_auth_cache = {}
 
 # header of form:  Authorization: ApplePass <serial>:<token>
 AUTH_RE = re.compile(r'^ApplePass\s+(?P<token>.+)$')
@@ -29,28 +50,99 @@ def _auth(event):
     return m.group('token') if m else None
 
 
-def _check_token(serial, token, pass_type):
-    resp = passes.get_item(Key={'serialNumber': serial})
-    item = resp.get('Item')
-    return (
-            item and
+def _load_pass(serial):
+    """One consistent read of just what the device routes need; refreshes the auth cache."""
+    item = passes.get_item(
+        Key={'serialNumber': serial},
+        ProjectionExpression='#a, passTypeIdentifier, lastModified',
+        ExpressionAttributeNames={'#a': 'auth'},
+        ConsistentRead=True,
+    ).get('Item')
+    if item:
+        if len(_auth_cache) >= AUTH_CACHE_MAX:
+            _auth_cache.clear()
+        _auth_cache[serial] = (time.monotonic() + AUTH_CACHE_TTL,
+                               item.get('passTypeIdentifier'), item.get('auth'))
+    return item
+
+
+def _authorized(item, token, pass_type):
+    return bool(
+            item and token and
             item.get('passTypeIdentifier') == pass_type and
             item.get('auth') == token
     )
 
-# ─── registration (POST) ───────────────────────────────────────────────────────
-def _maybe_register(event, raw):
-    if event["requestContext"]["http"]["method"] != "POST":
-        return None
 
-    parts = raw.split("?", 1)[0].split("/")
-    if len(parts) != 7 or parts[2] != "devices" or parts[4] != "registrations":
-        return None
+def _check_token(serial, token, pass_type):
+    """Token check served from the in-process cache while fresh.
+
+    A mismatch against a cached entry is re-checked with a real read, so a
+    stale entry can only cost a read, never a wrong 401.
+    """
+    if not token:
+        return False
+    cached = _auth_cache.get(serial)
+    if cached and cached[0] > time.monotonic() and cached[1:] == (pass_type, token):
+        return True
+    return _authorized(_load_pass(serial), token, pass_type)
+
+def _passes_updated_since(pass_type, since):
+    """Range query on the (passTypeIdentifier, lastModified) GSI, all pages."""
+    from boto3.dynamodb.conditions import Key
+    kwargs = {
+        'IndexName': PASSES_UPDATED_INDEX,
+        'KeyConditionExpression': (
+                Key('passTypeIdentifier').eq(pass_type) &
+                Key('lastModified').gt(since)
+        ),
+        'ProjectionExpression': 'serialNumber,lastModified',
+    }
+    items = []
+    while True:
+        resp = passes.query(**kwargs)
+        items.extend(resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            return items
+        kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+
+def _deliver_pass(serial, last_mod):
+    """Response carrying the current .pkpass, according to PASS_DELIVERY."""
+    key = f"{serial}.pkpass"
+    if PASS_DELIVERY == 'cdn' and PASS_CDN_BASE:
+        return {
+            'statusCode': 302,
+            'headers': {'Location': f"{PASS_CDN_BASE}/{key}?v={last_mod}",
+                        'Last-Modified': str(last_mod)},
+        }
+    if PASS_DELIVERY == 'redirect':
+        url = s3.generate_presigned_url('get_object',
+                                        Params={'Bucket': BUCKET, 'Key': key},
+                                        ExpiresIn=PASS_URL_TTL)
+        return {
+            'statusCode': 302,
+            'headers': {'Location': url, 'Last-Modified': str(last_mod)},
+        }
 
-    device_id = parts[3]
-    pass_type = parts[5]
-    serial    = parts[6]
+    # inline – a new lastModified is a new cache key, so stale bodies just age out
+    body = _pass_cache.get((serial, last_mod))
+    if body is None:
+        raw_bytes = s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+        body = base64.b64encode(raw_bytes).decode('ascii')
+        _pass_cache.put((serial, last_mod), body)
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/vnd.apple.pkpass',
+            'Last-Modified': str(last_mod)
+        },
+        'isBase64Encoded': True,
+        'body': body
+    }
 
+# ─── registration (POST) ───────────────────────────────────────────────────────
+def _register(event, device, pass_type, serial):
     token = _auth(event)
     if not _check_token(serial, token, pass_type):
         return {'statusCode': 401}
@@ -62,15 +154,17 @@ def _maybe_register(event, raw):
                 'body': json.dumps({'message': 'Missing pushToken'})}
 
     now = int(time.time() * 1000)
-    regs.put_item(Item={
-        'deviceLibraryIdentifier': device_id,   # ← partition key
+    reg = {
+        'deviceLibraryIdentifier': device,      # ← partition key
         'serialNumber':            serial,      # ← sort key
         'passTypeIdentifier':      pass_type,
         'pushToken':               push_token,
-        'updatedAt':               now
-    })
+        'updatedAt':               now,
+        'typeUpdated':             type_updated(pass_type, now)
+    }
 
-    passes.update_item(
+    def mark_installed():
+        return passes.update_item(
             Key={'serialNumber': serial},
             UpdateExpression="""
                 SET emailStatus = :s,
@@ -80,44 +174,42 @@ def _maybe_register(event, raw):
             ExpressionAttributeValues={
                 ':s': 'installed',
                 ':t': now
-            }
-        )
+            },
+            ReturnValues='UPDATED_OLD',
+        ).get('Attributes', {})
+
+    # the registration row and the pass status are independent writes
+    _, old = aws_io.gather(lambda: regs.put_item(Item=reg), mark_installed)
+    counters.shift(old.get('emailStatus'), 'installed')
 
-    logger.info("REGISTERED device=%s passType=%s serial=%s", device_id, pass_type, serial)
+    logger.info("REGISTERED device=%s passType=%s serial=%s", device, pass_type, serial)
     return {'statusCode': 201}
 
 
 # ─── list registrations (GET) ──────────────────────────────────────────────────
-def _maybe_list_regs(event, raw: str):
-    if event["requestContext"]["http"]["method"] != "GET":
-        return None
-
-    # /v1/devices/{deviceLID}/registrations/{passTypeIdentifier}
-    m = re.fullmatch(
-        r"/v1/devices/([^/]+)/registrations/([^/]+)", raw.split("?", 1)[0]
-    )
-    if not m:
-        return None
-
-    device_id, pass_type = m.groups()
-
+def _list_regs(event, device, pass_type):
+    from boto3.dynamodb.conditions import Key
     qs = event.get("queryStringParameters") or {}
     since_ms = int(qs.get("passesUpdatedSince", "0") or "0")
 
-    # The table HASH key is deviceLibraryIdentifier.
-    # We *can* query the base table, but using the GSI `deviceIdx`
-    # saves RCUs if the table ever grows large.
-    resp = regs.query(
-        IndexName="deviceIdx",  # deviceLibraryIdentifier HASH, serialNumber RANGE
-        KeyConditionExpression=Key("deviceLibraryIdentifier").eq(device_id),
-        FilterExpression=(
-            Attr("passTypeIdentifier").eq(pass_type) &
-            Attr("updatedAt").gte(Decimal(str(since_ms)))
+    # one key-range read of this device's rows for this pass type changed since
+    kwargs = {
+        "IndexName": REGS_TYPE_INDEX,
+        "KeyConditionExpression": (
+            Key("deviceLibraryIdentifier").eq(device) &
+            Key("typeUpdated").between(type_updated(pass_type, since_ms),
+                                       type_updated(pass_type, 10 ** 13 - 1))
         ),
-        ProjectionExpression="serialNumber, updatedAt",
-    )
+        "ProjectionExpression": "serialNumber, updatedAt",
+    }
+    items = []
+    while True:
+        resp = regs.query(**kwargs)
+        items.extend(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            break
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
 
-    items = resp.get("Items", [])
     if not items:
         return {"statusCode": 204}
 
@@ -131,196 +223,119 @@ def _maybe_list_regs(event, raw: str):
         }),
     }
 
-def _maybe_unregister(event, raw):
-    if event["requestContext"]["http"]["method"] != "DELETE":
-        return None
-
-    parts = raw.split("?", 1)[0].split("/")
-    if len(parts) != 7 or parts[2] != "devices" or parts[4] != "registrations":
-        return None
-
-    device_id = parts[3]
-    pass_type = parts[5]
-    serial    = parts[6]
 
+# ─── unregister (DELETE) ───────────────────────────────────────────────────────
+def _unregister(event, device, pass_type, serial):
     token = _auth(event)
     if not _check_token(serial, token, pass_type):
         return {"statusCode": 401}
 
     # The table’s key-schema is (deviceLibraryIdentifier, serialNumber)
     regs.delete_item(Key={
-        "deviceLibraryIdentifier": device_id,
+        "deviceLibraryIdentifier": device,
         "serialNumber":            serial
     })
 
     logger.info("UNREGISTERED device=%s passType=%s serial=%s",
-                device_id, pass_type, serial)
+                device, pass_type, serial)
     return {"statusCode": 200}
 
 
-def lambda_handler(event, _ctx):
-    logger.info("REQUEST: method=%s rawPath=%s routeKey=%s pathParams=%s",
-                event['requestContext']['http']['method'],
-                event.get('rawPath'),
-                event.get('requestContext')['http'].get('routeKey'),
-                event.get('pathParameters'))
-    method = event['requestContext']['http']['method']
-    raw = event['rawPath']
-    qp = event.get('queryStringParameters') or {}
-    pp = event.get('pathParameters') or {}
-    resp = _maybe_register(event, raw)
-    if resp:
-        return resp
-    resp = _maybe_list_regs(event, raw)      # ← new line
-    if resp:
-        return resp
-    resp = _maybe_unregister(event, raw)
-    if resp:
-        return resp
-
-    parts = raw.split("/")
-    device_id = parts[3] if len(parts) > 3 else None
-    pass_type = parts[5] if len(parts) > 5 else None
-    serial_param = parts[6] if len(parts) > 6 else None
-    logger.info("ROUTE: device_id=%s pass_type=%s serial=%s", device_id, pass_type, serial_param)
-
-    # extract common path parameters
-    pass_type = pp.get('passTypeIdentifier')
-    serial_param = pp.get('serialNumber')
-    device_id = pp.get('deviceLibraryIdentifier')
-    serial = pp.get('serialNumber')
-
-    # 1. GET /v1/passes/{passTypeIdentifier}/{serialNumber}
-    if method == 'GET' and pass_type and serial and raw.startswith(f"/v1/passes/{pass_type}/"):
-        token = _auth(event)
-        if not token or not _check_token(serial, token, pass_type):
-            return {'statusCode': 401}
-
-        # 1) load pass metadata (including lastModified)
-        resp = passes.get_item(Key={'serialNumber': serial})
-        item = resp.get('Item')
-        if not item:
-            return {'statusCode': 404}
-
-        last_mod = int(item.get('lastModified', 0))
-
-        # 2) parse the If-Modified-Since header (Wallet sends it as a millisecond‐tag)
-        headers = event.get('headers') or {}
-        ims_raw = headers.get('if-modified-since') or headers.get('If-Modified-Since')
-        if ims_raw:
-            try:
-                ims = int(ims_raw)
-            except ValueError:
-                ims = None
-
-            # 3) if nothing has changed, send 304
-            if ims is not None and last_mod <= ims:
-                logger.debug("Nothing to do, 304")
-                return {
-                    'statusCode': 304,
-                    # no body, no PKPASS content
-                }
-
-        # 4) otherwise, fetch and return the full .pkpass with updated Last-Modified
-        obj = s3.get_object(Bucket=BUCKET, Key=f"{serial}.pkpass")
-        raw_bytes = obj['Body'].read()
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/vnd.apple.pkpass',
-                'Last-Modified': str(last_mod)
-            },
-            'isBase64Encoded': True,
-            'body': base64.b64encode(raw_bytes).decode('ascii')
-        }
+# ─── pass delivery (GET) ───────────────────────────────────────────────────────
+def _get_pass(event, pass_type, serial):
+    # 1) one read gives both the auth check and lastModified
+    item = _load_pass(serial)
+    if not _authorized(item, _auth(event), pass_type):
+        return {'statusCode': 401}
 
-    # 2. GET /v1/passes/{passTypeIdentifier}?passesUpdatedSince=…
-    if method == 'GET' and pass_type and raw == f"/v1/passes/{pass_type}":
-        if 'passesUpdatedSince' not in qp:
-            return {'statusCode': 400, 'body': json.dumps({'message': 'Missing passesUpdatedSince'})}
-        since = int(qp['passesUpdatedSince'])
-        # scan for all passes of this type modified since…
-        scan = passes.scan(
-            FilterExpression=(
-                    Attr('passTypeIdentifier').eq(pass_type) &
-                    Attr('lastModified').gt(since)
-            ),
-            ProjectionExpression='serialNumber,lastModified'
-        )
-        items = scan.get('Items', [])
-        if not items:
-            return {'statusCode': 204}
-        serials = [i['serialNumber'] for i in items]
-        newtag = max(i['lastModified'] for i in items)
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'lastUpdated': newtag,
-                'serialNumbers': serials
-            })
-        }
+    last_mod = int(item.get('lastModified', 0))
+
+    # 2) parse the If-Modified-Since header (Wallet sends it as a millisecond‐tag)
+    headers = event.get('headers') or {}
+    ims_raw = headers.get('if-modified-since') or headers.get('If-Modified-Since')
+    if ims_raw:
+        try:
+            ims = int(ims_raw)
+        except ValueError:
+            ims = None
+
+        # 3) if nothing has changed, send 304
+        if ims is not None and last_mod <= ims:
+            logger.debug("Nothing to do, 304")
+            return {
+                'statusCode': 304,
+                # no body, no PKPASS content
+            }
 
- #3. POST /v1/devices/{deviceLID}/registrations/{passTypeIdentifier}/{serialNumber}
-    if (method == 'POST'
-            and device_id
-            and pass_type
-            and serial_param
-            and raw.startswith(f"/v1/devices/{device_id}/registrations/{pass_type}/{serial_param}")
-    ):
-        token = _auth(event)
-        if not _check_token(serial_param, token, pass_type):
-            return {'statusCode': 401}
-        body = json.loads(event.get('body') or '{}')
-        if 'pushToken' not in body:
-            return {'statusCode': 400,
-                    'body': json.dumps({'message': 'Missing pushToken'})}
-        # persist the device↔pass registration
-        regs.put_item(Item={
-            'deviceLibraryIdentifier': device_id,
-            'passTypeIdentifier':   pass_type,
-            'serialNumber':         serial_param,
-            'pushToken':            body['pushToken']
-        })
-        return {'statusCode': 201}
-
-    # 4. GET /v1/devices/{deviceLID}/registrations/{passTypeIdentifier}
-    if method == 'GET' and device_id and pass_type and raw.startswith(
-            f"/v1/devices/{device_id}/registrations/{pass_type}"):
-        serial, token = _auth(event)
-        if not _check_token(serial, token, pass_type):
-            return {'statusCode': 401}
-        # list all serials for this device + passType
-        scan = regs.scan(
-            FilterExpression=(
-                    Attr('deviceLibraryIdentifier').eq(device_id) &
-                    Attr('passTypeIdentifier').eq(pass_type)
-            ),
-            ProjectionExpression='serialNumber'
-        )
-        serials = [i['serialNumber'] for i in scan.get('Items', [])]
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'serialNumbers': serials})
-        }
+    # 4) otherwise hand out the current .pkpass with updated Last-Modified
+    return _deliver_pass(serial, last_mod)
 
-    # 5. DELETE /v1/devices/{deviceLID}/registrations/{passTypeIdentifier}/{serialNumber}
-    if method == 'DELETE' and device_id and pass_type and serial_param \
-            and raw.startswith(f"/v1/devices/{device_id}/registrations/{pass_type}/"):
-        serial, token = _auth(event)
-        if not _check_token(serial, token, pass_type):
-            return {'statusCode': 401}
-        regs.delete_item(Key={
-            'deviceLibraryIdentifier': device_id,
-            'passTypeIdentifier': pass_type,
-            'serialNumber': serial_param
+
+def _list_updated(event, pass_type):
+    qp = event.get('queryStringParameters') or {}
+    if 'passesUpdatedSince' not in qp:
+        return {'statusCode': 400, 'body': json.dumps({'message': 'Missing passesUpdatedSince'})}
+    since = int(qp['passesUpdatedSince'])
+    items = _passes_updated_since(pass_type, since)
+    if not items:
+        return {'statusCode': 204}
+    serials = [i['serialNumber'] for i in items]
+    newtag = str(int(max(i['lastModified'] for i in items)))
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'lastUpdated': newtag,
+            'serialNumbers': serials
         })
-        return {'statusCode': 200}
+    }
+
+
+def _log(event):
+    logger.info("PassKit client log: %s", event.get('body'))
+    return {'statusCode': 200}
+
+
+# ─── dispatch ──────────────────────────────────────────────────────────────────
+ROUTES = {
+    ('POST',   '/v1/devices/{device}/registrations/{pass_type}/{serial}'): _register,
+    ('DELETE', '/v1/devices/{device}/registrations/{pass_type}/{serial}'): _unregister,
+    ('GET',    '/v1/devices/{device}/registrations/{pass_type}'):          _list_regs,
+    ('GET',    '/v1/passes/{pass_type}/{serial}'):                         _get_pass,
+    ('GET',    '/v1/passes/{pass_type}'):                                  _list_updated,
+    ('POST',   '/v1/log'):                                                 _log,
+}
+
 
-    # 6. POST /v1/log
-    if method == 'POST' and raw.endswith('/v1/log'):
-        logger.info("PassKit client log: %s", event.get('body'))
-        return {'statusCode': 200}
+def _compile(routes):
+    """(method, segment count) → [(regex, template, handler)], built once at import."""
+    table = {}
+    for (method, template), handler in routes.items():
+        pattern = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', template)
+        key = (method, template.count('/'))
+        table.setdefault(key, []).append((re.compile(pattern), template, handler))
+    return table
 
-    # anything else…
-    logger.warning("FELL THROUGH to 404 for rawPath=%s", raw)
-    return {'statusCode': 404}
+
+_DISPATCH = _compile(ROUTES)
+
+
+def resolve(method, path):
+    """(template, handler, params) for a request path, or None."""
+    for regex, template, handler in _DISPATCH.get((method, path.count('/')), ()):
+        m = regex.fullmatch(path)
+        if m:
+            return template, handler, {k: unquote(v) for k, v in m.groupdict().items()}
+    return None
+
+
+def lambda_handler(event, _ctx):
+    method = event['requestContext']['http']['method']
+    path = event['rawPath'].split('?', 1)[0]
+    logger.info("REQUEST: method=%s rawPath=%s", method, path)
+
+    route = resolve(method, path)
+    if route is None:
+        logger.warning("FELL THROUGH to 404 for rawPath=%s", path)
+        return {'statusCode': 404}
+    _template, handler, params = route
+    return handler(event, **params)
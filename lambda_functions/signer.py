@@ -0,0 +1,302 @@
+"""
+Detached PKCS#7 signer for the manifest.json of a .pkpass.
+
+Two engines produce the same DER `signature` file:
+  cms      – in-process: the PKCS#12 bundle is parsed once and the SHA-1
+             SignedData structure is assembled in memory (needs `cryptography`)
+  openssl  – the original path: extract PEMs with `openssl pkcs12` and sign
+             with `openssl smime` in a temp dir (needs the OpenSSL layer)
+
+The certificate bundle and its password come from SSM in one batched call
+and are kept, already decoded and extracted, for CERT_CACHE_TTL seconds.
+After that the parameter versions are re-read; the key material is only
+rebuilt when a version changed, so a certificate rotation is picked up by
+warm containers without a cold start.
+
+Env: PASS_SIGNER (cms | openssl, default cms), CERT_CACHE_TTL (seconds, default 300)
+"""
+import atexit
+import base64
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import aws_io
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+    from cryptography.hazmat.primitives.serialization import (
+        Encoding, NoEncryption, PrivateFormat, pkcs12,
+    )
+except ImportError:  # layer without cryptography → openssl only
+    x509 = None
+
+# Make sure your OpenSSL layer is attached and on PATH
+os.environ['PATH'] = '/opt/bin:' + os.environ.get('PATH', '')
+OPENSSL = '/opt/bin/openssl'
+
+ssm = aws_io.client('ssm')
+
+CERT_PARAM = '/passkit/cert'
+CERT_PASS_PARAM = '/passkit/certPass'
+WWDR_PATH = os.path.join(os.getcwd(), 'AppleWWDR.pem')
+ENGINE = os.environ.get('PASS_SIGNER', 'cms')
+CERT_CACHE_TTL = float(os.environ.get('CERT_CACHE_TTL', '300'))
+
+
+# ─── DER helpers ───────────────────────────────────────────────────────────────
+def _der(tag, body):
+    n = len(body)
+    if n < 0x80:
+        return bytes([tag, n]) + body
+    ln = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+    return bytes([tag, 0x80 | len(ln)]) + ln + body
+
+
+def _seq(*parts):
+    return _der(0x30, b''.join(parts))
+
+
+def _set(*parts):
+    # DER: SET OF members are ordered by their encoding
+    return _der(0x31, b''.join(sorted(parts)))
+
+
+def _int(v):
+    return _der(0x02, v.to_bytes(v.bit_length() // 8 + 1, 'big'))
+
+
+def _oid(dotted):
+    arcs = [int(a) for a in dotted.split('.')]
+    body = bytearray([40 * arcs[0] + arcs[1]])
+    for arc in arcs[2:]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        body += bytes(reversed(chunk))
+    return _der(0x06, bytes(body))
+
+
+_NULL = b'\x05\x00'
+OID_DATA = _oid('1.2.840.113549.1.7.1')
+OID_SIGNED_DATA = _oid('1.2.840.113549.1.7.2')
+OID_CONTENT_TYPE = _oid('1.2.840.113549.1.9.3')
+OID_MESSAGE_DIGEST = _oid('1.2.840.113549.1.9.4')
+OID_SIGNING_TIME = _oid('1.2.840.113549.1.9.5')
+ALG_SHA1 = _seq(_oid('1.3.14.3.2.26'), _NULL)
+ALG_RSA = _seq(_oid('1.2.840.113549.1.1.1'), _NULL)
+ALG_ECDSA_SHA1 = _seq(_oid('1.2.840.10045.4.1'))
+
+
+# ─── in-process engine ─────────────────────────────────────────────────────────
+class SigningIdentity:
+    """Private key + certificate chain, parsed once from the PKCS#12 bundle.
+
+    Everything in the SignedData that does not depend on the manifest
+    (certificate set, signer id, algorithm identifiers) is pre-encoded here,
+    so sign() is one SHA-1, one private-key operation and some concatenation.
+    """
+
+    def __init__(self, p12_bytes, p12_pass, wwdr_pem):
+        if x509 is None:
+            raise RuntimeError("cms signer needs the 'cryptography' package")
+        key, cert, _extra = pkcs12.load_key_and_certificates(p12_bytes, p12_pass.encode())
+        if key is None or cert is None:
+            raise RuntimeError("PKCS#12 bundle has no private key / certificate")
+        chain = [cert] + x509.load_pem_x509_certificates(wwdr_pem)
+
+        self.key = key
+        self.cert = cert
+        self._certs = _der(0xA0, b''.join(c.public_bytes(Encoding.DER) for c in chain))
+        self._sid = _seq(cert.issuer.public_bytes(), _int(cert.serial_number))
+        if isinstance(key, rsa.RSAPrivateKey):
+            self._sig_alg = ALG_RSA
+        elif isinstance(key, ec.EllipticCurvePrivateKey):
+            self._sig_alg = ALG_ECDSA_SHA1
+        else:
+            raise RuntimeError(f"unsupported signing key {type(key).__name__}")
+
+    def sign(self, data: bytes) -> bytes:
+        """Return a DER, detached, SHA-1 CMS SignedData over `data`."""
+        signed_attrs = b''.join(sorted([
+            _seq(OID_CONTENT_TYPE, _set(OID_DATA)),
+            _seq(OID_SIGNING_TIME, _set(_der(0x17, time.strftime('%y%m%d%H%M%SZ', time.gmtime()).encode()))),
+            _seq(OID_MESSAGE_DIGEST, _set(_der(0x04, hashlib.sha1(data).digest()))),
+        ]))
+        # the signature covers the attributes re-tagged as a universal SET
+        to_sign = _der(0x31, signed_attrs)
+        if self._sig_alg is ALG_RSA:
+            sig = self.key.sign(to_sign, padding.PKCS1v15(), hashes.SHA1())
+        else:
+            sig = self.key.sign(to_sign, ec.ECDSA(hashes.SHA1()))
+
+        signer_info = _seq(
+            _int(1),
+            self._sid,
+            ALG_SHA1,
+            _der(0xA0, signed_attrs),
+            self._sig_alg,
+            _der(0x04, sig),
+        )
+        signed_data = _seq(
+            _int(1),
+            _set(ALG_SHA1),
+            _seq(OID_DATA),         # detached: no eContent
+            self._certs,
+            _set(signer_info),
+        )
+        return _seq(OID_SIGNED_DATA, _der(0xA0, signed_data))
+
+
+# ─── openssl engine (fallback) ─────────────────────────────────────────────────
+def _run_openssl(args, input_bytes=None):
+    """Run openssl with args list, capture stderr, raise on error with diagnostics."""
+    proc = subprocess.run(
+        [OPENSSL] + args,
+        input=input_bytes,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"openssl {' '.join(args)} failed (exit {proc.returncode}):\n"
+            f"{proc.stderr.decode().strip()}"
+        )
+    return proc.stdout
+
+
+def extract_pems(p12_bytes: bytes, p12_pass: str, out_dir: str):
+    """Split the bundle into cert.pem / key.pem inside out_dir; returns both paths."""
+    p12_path = os.path.join(out_dir, 'bundle.p12')
+    cert_path = os.path.join(out_dir, 'cert.pem')
+    key_path = os.path.join(out_dir, 'key.pem')
+
+    # write the .p12 file
+    with open(p12_path, 'wb') as f:
+        f.write(p12_bytes)
+
+    # Extract only the client cert (no keys) with -clcerts
+    _run_openssl([
+        'pkcs12',
+        '-in', p12_path,
+        '-clcerts',  # only the client certificate
+        '-nokeys',
+        '-passin', f'pass:{p12_pass}',
+        '-out', cert_path
+    ])
+
+    # Extract only the private key
+    _run_openssl([
+        'pkcs12',
+        '-in', p12_path,
+        '-nocerts',
+        '-nodes',
+        '-passin', f'pass:{p12_pass}',
+        '-out', key_path
+    ])
+    os.remove(p12_path)
+    return cert_path, key_path
+
+
+def sign_openssl(cert_path: str, key_path: str, data: bytes) -> bytes:
+    # Sign → DER signature on stdout
+    #    Make sure AppleWWDRCA.pem is in your code root
+    return _run_openssl([
+        'smime',
+        '-binary',
+        '-sign',
+        '-signer', cert_path,
+        '-inkey', key_path,
+        '-certfile', WWDR_PATH,
+        '-outform', 'DER',
+        '-md', 'sha1',
+    ], input_bytes=data)
+
+
+# ─── credential cache ──────────────────────────────────────────────────────────
+class Credentials:
+    """Signing material for one (cert, certPass) parameter-version pair."""
+
+    def __init__(self, versions, p12_bytes, p12_pass, engine):
+        self.versions = versions
+        self.engine = engine
+        self.identity = None
+        self.pem_dir = None
+        if engine == 'cms' and x509 is not None:
+            with open(WWDR_PATH, 'rb') as f:
+                self.identity = SigningIdentity(p12_bytes, p12_pass, f.read())
+        else:
+            self.pem_dir = tempfile.mkdtemp(prefix='passkit-')
+            self.cert_path, self.key_path = extract_pems(p12_bytes, p12_pass, self.pem_dir)
+
+    def pem_paths(self):
+        """(cert.pem, key.pem) on disk – for TLS client auth, e.g. APNs."""
+        if self.pem_dir is None:
+            pem_dir = tempfile.mkdtemp(prefix='passkit-')
+            self.cert_path = os.path.join(pem_dir, 'cert.pem')
+            self.key_path = os.path.join(pem_dir, 'key.pem')
+            with open(self.cert_path, 'wb') as f:
+                f.write(self.identity.cert.public_bytes(Encoding.PEM))
+            with open(os.open(self.key_path, os.O_WRONLY | os.O_CREAT, 0o600), 'wb') as f:
+                f.write(self.identity.key.private_bytes(
+                    Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+            self.pem_dir = pem_dir
+        return self.cert_path, self.key_path
+
+    def sign(self, data: bytes) -> bytes:
+        if self.identity is not None:
+            return self.identity.sign(data)
+        return sign_openssl(self.cert_path, self.key_path, data)
+
+    def close(self):
+        if self.pem_dir:
+            shutil.rmtree(self.pem_dir, ignore_errors=True)
+
+
+_creds = {}         # engine → Credentials
+_checked_at = {}    # engine → monotonic time of the last SSM version check
+_lock = threading.Lock()
+
+
+def credentials(engine: str = None) -> Credentials:
+    """Return cached credentials, re-checking SSM versions once the TTL lapses."""
+    engine = engine or ENGINE
+    with _lock:
+        cur = _creds.get(engine)
+        if cur is not None and time.monotonic() - _checked_at[engine] < CERT_CACHE_TTL:
+            return cur
+
+        resp = ssm.get_parameters(Names=[CERT_PARAM, CERT_PASS_PARAM], WithDecryption=True)
+        params = {p['Name']: p for p in resp['Parameters']}
+        if resp.get('InvalidParameters'):
+            raise RuntimeError(f"missing SSM parameters: {resp['InvalidParameters']}")
+
+        versions = (params[CERT_PARAM]['Version'], params[CERT_PASS_PARAM]['Version'])
+        if cur is None or cur.versions != versions:
+            new = Credentials(
+                versions,
+                base64.b64decode(params[CERT_PARAM]['Value']),
+                params[CERT_PASS_PARAM]['Value'],
+                engine,
+            )
+            if cur is not None:
+                # pool threads may still be signing with the old PEM files;
+                # leave them on disk until the container shuts down
+                atexit.register(cur.close)
+            _creds[engine] = cur = new
+        _checked_at[engine] = time.monotonic()
+        return cur
+
+
+# ─── public entry ──────────────────────────────────────────────────────────────
+def sign_manifest(manifest_bytes: bytes, engine: str = None) -> bytes:
+    """Sign manifest.json bytes with the selected engine; returns DER bytes."""
+    return credentials(engine).sign(manifest_bytes)
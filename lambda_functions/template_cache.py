@@ -0,0 +1,141 @@
+"""
+Pre-indexed, pre-hashed copy of the pass template.
+
+The template comes from the compiled artifact published by
+template_compiler.py (compiled/current.json → compiled/{version}.zip):
+names are already normalised, pass.json validated and every asset SHA-1
+listed in its manifest, so loading it is a plain unzip. Per pass only
+pass.json has to be patched and hashed. Every TEMPLATE_CHECK_TTL seconds a
+conditional GET on the pointer's ETag tells us whether a new version was
+published. Until a template has been compiled the hand-maintained
+template.zip is used as before. A 403 on the pointer counts as "not
+compiled yet" too: without s3:ListBucket, S3 reports a missing key as
+AccessDenied, so roles that can only GetObject keep working.
+
+Env: BUCKET_TEMPLATES, TEMPLATE_CHECK_TTL (seconds, default 30)
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from types import MappingProxyType
+
+
+import aws_io
+import template_compiler
+
+s3 = aws_io.client('s3')
+
+BUCKET_TPL = os.environ['BUCKET_TEMPLATES']
+TEMPLATE_KEY = 'template.zip'
+TEMPLATE_CHECK_TTL = float(os.environ.get('TEMPLATE_CHECK_TTL', '30'))
+
+
+class Template:
+    """Immutable view of one template revision."""
+
+    def __init__(self, etag: str, version: str, files: dict, digests: dict,
+                 pass_json_name: str, pass_json: dict, source: str):
+        self.etag = etag
+        self.version = version
+        self.source = source
+        self.files = MappingProxyType(files)
+        self.digests = MappingProxyType(digests)
+        self.assets_hash = template_compiler.assets_hash(digests)
+        self.pass_json_name = pass_json_name
+        self.pass_json = MappingProxyType(pass_json)
+
+    @classmethod
+    def from_artifact(cls, etag: str, version: str, zip_bytes: bytes):
+        files, manifest, pass_json = template_compiler.read_artifact(zip_bytes)
+        return cls(etag, version, files, manifest, 'pass.json', pass_json, 'compiled')
+
+    @classmethod
+    def from_zip(cls, etag: str, zip_bytes: bytes):
+        """Legacy template.zip: detect the top-level folder and hash every asset."""
+        files = {}
+        pass_json_name = None
+        pass_json = None
+
+        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as z:
+            # find all real file entries (skip directories)
+            file_names = [n for n in z.namelist() if not n.endswith('/')]
+            # detect a common top-level prefix (like "template/")
+            common_prefix = os.path.commonprefix(file_names)
+            if common_prefix and '/' in common_prefix:
+                # ensure we cut at a slash boundary
+                common_prefix = common_prefix.split('/', 1)[0] + '/'
+            else:
+                common_prefix = ''
+
+            for full_name in file_names:
+                name = full_name[len(common_prefix):] if full_name.startswith(common_prefix) else full_name
+                if name.lower().endswith('pass.json'):
+                    pass_json_name = name
+                    pass_json = json.loads(z.read(full_name))
+                    continue
+                files[name] = z.read(full_name)
+
+        if pass_json_name is None:
+            raise RuntimeError("template.zip didn’t contain a pass.json")
+
+        digests = {n: hashlib.sha1(d).hexdigest() for n, d in files.items()}
+        return cls(etag, etag, files, digests, pass_json_name, pass_json, 'zip')
+
+    def render(self, *patches: dict) -> bytes:
+        """Apply top-level patches to a copy of pass.json; returns canonical bytes."""
+        j = dict(self.pass_json)
+        for p in patches:
+            j.update(p)
+        return json.dumps(j, separators=(',', ':'), sort_keys=True).encode()
+
+
+_current = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _get_if_changed(key, source):
+    """Conditional GET against the cached revision if it came from `key`; None on 304."""
+    from botocore.exceptions import ClientError
+    kwargs = {}
+    if _current is not None and _current.source == source:
+        kwargs['IfNoneMatch'] = _current.etag
+    try:
+        return s3.get_object(Bucket=BUCKET_TPL, Key=key, **kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('304', 'NotModified'):
+            raise
+        return None
+
+
+def _load():
+    from botocore.exceptions import ClientError
+    try:
+        obj = _get_if_changed(template_compiler.POINTER_KEY, 'compiled')
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404', 'AccessDenied', '403'):
+            raise
+        # nothing compiled yet – fall back to the hand-maintained template.zip
+        obj = _get_if_changed(TEMPLATE_KEY, 'zip')
+        return Template.from_zip(obj['ETag'], obj['Body'].read()) if obj else _current
+    if obj is None:
+        return _current
+
+    pointer = json.loads(obj['Body'].read())
+    artifact = s3.get_object(Bucket=BUCKET_TPL, Key=pointer['key'])['Body'].read()
+    return Template.from_artifact(obj['ETag'], pointer['version'], artifact)
+
+
+def get() -> Template:
+    """Return the cached template, revalidating its pointer once the TTL lapses."""
+    global _current, _checked_at
+    with _lock:
+        if _current is not None and time.monotonic() - _checked_at < TEMPLATE_CHECK_TTL:
+            return _current
+        _current = _load()
+        _checked_at = time.monotonic()
+        return _current
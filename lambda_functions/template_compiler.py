@@ -0,0 +1,208 @@
+"""
+Compiles the loose template files edited through template_routes.py into
+one immutable, versioned artifact the pass builders load directly.
+
+    {TEMPLATE_PREFIX}…           loose files (TemplateEditor uploads)
+    compiled/{version}.zip       assets + canonical pass.json + manifest.json
+    compiled/current.json        pointer → {version, key, files, bytes, …}
+
+Names are normalised (prefix stripped, hidden files / manifest / signature
+dropped), pass.json is validated, image variants are checked (pngopt.py),
+and manifest.json holds the SHA-1 of every asset so signers only ever hash
+pass.json. The version is derived
+from the content, so recompiling an unchanged template is a no-op, and
+the pointer is replaced with a single PUT – readers see the old template
+or the new one, never a mix. That PUT is conditional on the pointer being
+the one seen before the files were listed; a compile that loses the race
+to a concurrent edit lists and compiles again, so the last publish always
+reflects the newest files.
+"""
+import hashlib
+import io
+import json
+import time
+import zipfile
+
+
+import aws_io
+import pngopt
+
+s3 = aws_io.client('s3')
+
+COMPILED_PREFIX = 'compiled/'
+POINTER_KEY = COMPILED_PREFIX + 'current.json'
+MANIFEST_NAME = 'manifest.json'
+PUBLISH_ATTEMPTS = 5
+
+# top-level keys Wallet refuses a pass without (serialNumber is set per pass)
+REQUIRED_KEYS = ('description', 'formatVersion', 'organizationName',
+                 'passTypeIdentifier', 'teamIdentifier')
+PASS_STYLES = ('boardingPass', 'coupon', 'eventTicket', 'generic', 'storeCard')
+
+
+class TemplateError(ValueError):
+    """The template cannot be compiled; .errors lists every problem found."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def canonical_json(obj) -> bytes:
+    return json.dumps(obj, separators=(',', ':'), sort_keys=True).encode()
+
+
+def assets_hash(digests: dict) -> str:
+    """Hash of a pass's asset manifest ({name: sha1}), pass.json excluded."""
+    assets = {n: d for n, d in digests.items()
+              if n.lower() not in ('pass.json', MANIFEST_NAME, 'signature')}
+    return hashlib.sha256(canonical_json(assets)).hexdigest()[:32]
+
+
+def fingerprint(assets: str, pass_json: bytes) -> str:
+    """
+    Content fingerprint of a pass: its assets_hash plus its canonical
+    pass.json. Equal fingerprints mean byte-identical pass contents.
+    """
+    return hashlib.sha256(assets.encode() + b':' + pass_json).hexdigest()[:32]
+
+
+def validate_pass_json(data: bytes) -> dict:
+    try:
+        pass_json = json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise TemplateError([f"pass.json is not valid JSON: {e}"])
+    if not isinstance(pass_json, dict):
+        raise TemplateError(["pass.json must be a JSON object"])
+
+    errors = [f"pass.json is missing {k}" for k in REQUIRED_KEYS if k not in pass_json]
+    if pass_json.get('formatVersion', 1) != 1:
+        errors.append("pass.json formatVersion must be 1")
+    styles = [s for s in PASS_STYLES if s in pass_json]
+    if len(styles) != 1:
+        errors.append(f"pass.json needs exactly one pass style of {', '.join(PASS_STYLES)}")
+    if errors:
+        raise TemplateError(errors)
+    return pass_json
+
+
+def normalise_name(name: str):
+    """Template-relative name → name inside the pass, or None to drop it."""
+    parts = [p for p in name.split('/') if p]
+    if not parts or any(p.startswith('.') for p in parts):
+        return None
+    name = '/'.join(parts)
+    if name.lower() in (MANIFEST_NAME, 'signature'):
+        return None
+    if name.lower() == 'pass.json':
+        return 'pass.json'
+    return name
+
+
+def build_artifact(files: dict):
+    """
+    {normalised name: bytes} → (version, artifact zip bytes, manifest).
+    Raises TemplateError if the files do not make a valid pass template.
+    """
+    if 'pass.json' not in files:
+        raise TemplateError(["template has no pass.json"])
+    pass_json = canonical_json(validate_pass_json(files['pass.json']))
+    assets = {n: d for n, d in files.items() if n != 'pass.json'}
+    if 'icon.png' not in assets:
+        raise TemplateError(["template has no icon.png"])
+
+    manifest = {n: hashlib.sha1(d).hexdigest() for n, d in sorted(assets.items())}
+    version = hashlib.sha1(canonical_json(manifest) + pass_json).hexdigest()[:20]
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name in sorted(assets):
+            zf.writestr(name, assets[name])
+        zf.writestr('pass.json', pass_json)
+        zf.writestr(MANIFEST_NAME, canonical_json(manifest))
+    return version, buf.getvalue(), manifest
+
+
+def _read_prefix(bucket, prefix):
+    keys = []
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        keys += [o['Key'] for o in page.get('Contents', []) if not o['Key'].endswith('/')]
+
+    def fetch(key):
+        return key, s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+
+    files = {}
+    for key, data in aws_io.executor.map(fetch, keys):
+        name = normalise_name(key[len(prefix):])
+        if name:
+            files[name] = data
+    return files
+
+
+def _pointer_etag(bucket):
+    """ETag of the published pointer, None if nothing is published yet."""
+    from botocore.exceptions import ClientError
+    try:
+        return s3.head_object(Bucket=bucket, Key=POINTER_KEY)['ETag']
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        return None
+
+
+def compile_template(bucket: str, prefix: str) -> dict:
+    """
+    Compile {prefix}* in `bucket`, upload the artifact if this version is
+    new and publish the pointer. Returns the pointer. Raises TemplateError
+    (and leaves the current pointer alone) if the template is invalid.
+    """
+    from botocore.exceptions import ClientError
+    for _ in range(PUBLISH_ATTEMPTS):
+        # read before listing: any publish after this point makes ours stale
+        etag = _pointer_etag(bucket)
+        pointer = _compile(bucket, prefix)
+        guard = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            s3.put_object(Bucket=bucket, Key=POINTER_KEY, Body=json.dumps(pointer).encode(),
+                          ContentType='application/json', **guard)
+            return pointer
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('PreconditionFailed', '412',
+                                                   'ConditionalRequestConflict', '409'):
+                raise
+    raise RuntimeError(f"template pointer still contended after {PUBLISH_ATTEMPTS} attempts")
+
+
+def _compile(bucket, prefix):
+    """List and compile {prefix}*, upload the artifact if new → unpublished pointer."""
+    from botocore.exceptions import ClientError
+    files = _read_prefix(bucket, prefix)
+    version, artifact, manifest = build_artifact(files)
+    key = f"{COMPILED_PREFIX}{version}.zip"
+    # artifacts are immutable and content-addressed: never rewrite one
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        s3.put_object(Bucket=bucket, Key=key, Body=artifact, ContentType='application/zip')
+
+    pointer = {
+        'version': version,
+        'key': key,
+        'files': sorted(manifest) + ['pass.json'],
+        'bytes': len(artifact),                       # ≈ size of every .pkpass built
+        'assetBytes': sum(len(d) for d in files.values()),
+        'warnings': pngopt.check_variants(files),
+        'compiledAt': int(time.time() * 1000),
+    }
+    return pointer
+
+
+def read_artifact(zip_bytes: bytes):
+    """Artifact bytes → (assets, manifest, pass.json dict); nothing to detect or hash."""
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        files = {n: zf.read(n) for n in zf.namelist()}
+    manifest = json.loads(files.pop(MANIFEST_NAME))
+    pass_json = json.loads(files.pop('pass.json'))
+    return files, manifest, pass_json
@@ -3,11 +3,14 @@ import os
 import json
 import base64
 import urllib.parse
-import boto3
+
+import aws_io
+import pngopt
+import template_compiler
 
 BUCKET        = os.environ['BUCKET_TEMPLATES']
 PREFIX        = os.environ.get('TEMPLATE_PREFIX', 'template/')
-s3            = boto3.client('s3')
+s3            = aws_io.client('s3')
 
 def lambda_handler(event, context):
     method      = event['httpMethod']
@@ -68,10 +71,54 @@ def upload_file(name, event):
         data = body.encode()
     content_type = 'application/json' if is_json else 'application/octet-stream'
 
+    # a broken pass.json is refused outright; the stored one keeps working
+    if template_compiler.normalise_name(name) == 'pass.json':
+        try:
+            template_compiler.validate_pass_json(data)
+        except template_compiler.TemplateError as e:
+            return {
+                'statusCode': 422,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'message': 'Invalid pass.json', 'errors': e.errors})
+            }
+
+    # images go in losslessly recompressed and without metadata
+    optimised = None
+    if name.lower().endswith('.png'):
+        try:
+            data, optimised = pngopt.optimise(data)
+        except pngopt.PNGError as e:
+            return {
+                'statusCode': 422,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'message': f'Invalid PNG: {e}'})
+            }
+        content_type = 'image/png'
+
     s3.put_object(Bucket=BUCKET, Key=key, Body=data, ContentType=content_type)
-    return {'statusCode': 204}
+    return compile_template(optimised)
 
 def delete_file(name):
     key = PREFIX + name
     s3.delete_object(Bucket=BUCKET, Key=key)
-    return {'statusCode': 204}
+    return compile_template()
+
+def compile_template(optimised=None):
+    """
+    Rebuild the compiled template after an edit. If the files do not make a
+    valid template yet (e.g. icon.png not uploaded), the edit is kept, the
+    previously published version stays live and the problems are reported.
+    `optimised` is the PNG report of the uploaded image, if it was one.
+    """
+    try:
+        pointer = template_compiler.compile_template(BUCKET, PREFIX)
+        result = {'compiled': pointer}
+    except template_compiler.TemplateError as e:
+        result = {'compiled': None, 'errors': e.errors}
+    if optimised:
+        result['optimised'] = optimised
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(result)
+    }
@@ -0,0 +1,146 @@
+"""
+push_dispatcher.py against the local fake APNs server (fake_apns.py) and a
+moto registrations table: 200 → delivered, 410 → the dead token's
+registrations are removed, 429 → the message comes back in
+batchItemFailures.
+
+    python -m pytest -q test_push_dispatcher.py
+"""
+import datetime
+import json
+import os
+import types
+
+import pytest
+
+pytest.importorskip('h2')
+pytest.importorskip('httpx')
+moto = pytest.importorskip('moto')
+x509 = pytest.importorskip('cryptography.x509')
+from cryptography.hazmat.primitives import hashes                       # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec                # noqa: E402
+from cryptography.hazmat.primitives.serialization import (              # noqa: E402
+    Encoding, NoEncryption, PrivateFormat,
+)
+from cryptography.x509.oid import NameOID                               # noqa: E402
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-2')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'test')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'test')
+os.environ.setdefault('TABLE_REGS', 'test-regs')
+
+import aws_io                                                           # noqa: E402
+import fake_apns                                                        # noqa: E402
+import push_dispatcher                                                  # noqa: E402
+
+PASS_TYPE = 'pass.uk.co.mk-lightning.season-ticket'
+
+
+def _self_signed(tmp_path, name):
+    """(cert.pem, key.pem) paths for a throwaway self-signed certificate."""
+    key = ec.generate_private_key(ec.SECP256R1())
+    now = datetime.datetime.now(datetime.timezone.utc)
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+    cert = (x509.CertificateBuilder()
+            .subject_name(subject).issuer_name(subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = tmp_path / f'{name}.pem', tmp_path / f'{name}.key'
+    cert_path.write_bytes(cert.public_bytes(Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, NoEncryption()))
+    return str(cert_path), str(key_path)
+
+
+class _SmallPages:
+    """The regs table, but every query returns at most two items."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def query(self, **kwargs):
+        return self._table.query(Limit=2, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+
+@pytest.fixture
+def apns(tmp_path, monkeypatch):
+    server = fake_apns.FakeAPNs(*_self_signed(tmp_path, 'apns')).start()
+    client_pems = _self_signed(tmp_path, 'pass-type')
+    monkeypatch.setattr(push_dispatcher, 'APNS_HOST', server.url)
+    monkeypatch.setattr(push_dispatcher, 'APNS_VERIFY', False)
+    monkeypatch.setattr(push_dispatcher, '_client', None)
+    monkeypatch.setattr(push_dispatcher.signer, 'credentials', lambda: types.SimpleNamespace(
+        versions=('1', '1'), pem_paths=lambda: client_pems))
+    yield server
+    if push_dispatcher._client is not None:
+        push_dispatcher._client.close()
+    server.stop()
+
+
+@pytest.fixture
+def regs(monkeypatch):
+    with moto.mock_aws():
+        aws_io.resource('dynamodb').create_table(
+            TableName=os.environ['TABLE_REGS'],
+            KeySchema=[{'AttributeName': 'deviceLibraryIdentifier', 'KeyType': 'HASH'},
+                       {'AttributeName': 'serialNumber', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': a, 'AttributeType': 'S'}
+                                  for a in ('deviceLibraryIdentifier', 'serialNumber')],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        monkeypatch.setattr(push_dispatcher, 'regs', _SmallPages(push_dispatcher.regs))
+        yield push_dispatcher.regs
+
+
+def _put(regs, device, serial, token):
+    regs.put_item(Item={'deviceLibraryIdentifier': device, 'serialNumber': serial,
+                        'passTypeIdentifier': PASS_TYPE, 'pushToken': token})
+
+
+def _devices(regs):
+    return sorted((i['deviceLibraryIdentifier'], i['serialNumber'])
+                  for i in regs.scan()['Items'])
+
+
+def _message(mid, *pushes):
+    return {'messageId': mid, 'body': json.dumps({'pushes': [
+        {'token': token, 'device': device, 'passType': PASS_TYPE} for token, device in pushes
+    ]})}
+
+
+def test_delivered_gone_and_throttled(apns, regs):
+    _put(regs, 'dev-ok', 'S1', 'ok-token')
+    for n in range(5):                       # spans several query pages
+        _put(regs, 'dev-gone', f'S{n}', 'gone-token')
+    _put(regs, 'dev-gone', 'S9', 'newer-token')
+    _put(regs, 'dev-busy', 'S1', 'throttle-token')
+
+    result = push_dispatcher.lambda_handler({'Records': [
+        _message('m-ok', ('ok-token', 'dev-ok')),
+        _message('m-gone', ('gone-token', 'dev-gone')),
+        _message('m-busy', ('throttle-token', 'dev-busy'), ('ok-token', 'dev-ok')),
+    ]}, None)
+
+    assert result == {'batchItemFailures': [{'itemIdentifier': 'm-busy'}]}
+    assert sorted(apns.requests) == sorted([
+        ('ok-token', PASS_TYPE), ('gone-token', PASS_TYPE),
+        ('throttle-token', PASS_TYPE), ('ok-token', PASS_TYPE),
+    ])
+    # every registration still on the dead token is gone; the rest are kept
+    assert _devices(regs) == [('dev-busy', 'S1'), ('dev-gone', 'S9'), ('dev-ok', 'S1')]
+
+
+def test_unreadable_message_is_dropped(apns, regs):
+    result = push_dispatcher.lambda_handler({'Records': [
+        {'messageId': 'm-bad', 'body': 'not json'},
+        _message('m-ok', ('ok-token', 'dev-ok')),
+    ]}, None)
+
+    assert result == {'batchItemFailures': []}
+    assert apns.requests == [('ok-token', PASS_TYPE)]
@@ -0,0 +1,131 @@
+"""
+Both signer engines must produce a detached signature that verifies
+against the same manifest. Uses a throwaway CA + PKCS#12 bundle built with
+`cryptography`; the openssl half is skipped when the binary is missing.
+
+    python -m pytest -q test_signer.py
+"""
+import datetime
+import hashlib
+import os
+import shutil
+import subprocess
+
+import pytest
+
+x509 = pytest.importorskip('cryptography.x509')
+from cryptography.hazmat.primitives import hashes                       # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import padding, rsa      # noqa: E402
+from cryptography.hazmat.primitives.serialization import (              # noqa: E402
+    BestAvailableEncryption, Encoding, pkcs12,
+)
+from cryptography.x509.oid import NameOID                               # noqa: E402
+
+import signer                                                           # noqa: E402
+
+MANIFEST = b'{"icon.png":"0a4d55a8d778e5022fab701977c5d840bbc486d0","pass.json":"x"}'
+P12_PASS = 'test-pass'
+OPENSSL = shutil.which('openssl')
+
+
+def _cert(subject, issuer, key, issuer_key, ca):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return (x509.CertificateBuilder()
+            .subject_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, subject)]))
+            .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, issuer)]))
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+            .sign(issuer_key, hashes.SHA256()))
+
+
+@pytest.fixture(scope='module')
+def pki(tmp_path_factory):
+    """(p12 bytes, CA PEM path, leaf certificate) for a throwaway CA."""
+    ca_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ca = _cert('Test WWDR', 'Test WWDR', ca_key, ca_key, ca=True)
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    leaf = _cert('Pass Type ID: pass.test', 'Test WWDR', key, ca_key, ca=False)
+
+    ca_path = tmp_path_factory.mktemp('pki') / 'wwdr.pem'
+    ca_path.write_bytes(ca.public_bytes(Encoding.PEM))
+    p12 = pkcs12.serialize_key_and_certificates(
+        b'pass', key, leaf, None, BestAvailableEncryption(P12_PASS.encode()))
+    return p12, str(ca_path), leaf
+
+
+# ─── minimal DER walk: ContentInfo → SignedData → SignerInfo ──────────────────
+def _tlv(buf, pos=0):
+    """(tag, header + content, content, next position) of the element at pos."""
+    start, tag, length = pos, buf[pos], buf[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(buf[pos:pos + n], 'big')
+        pos += n
+    return tag, buf[start:pos + length], buf[pos:pos + length], pos + length
+
+
+def _children(body):
+    out, pos = [], 0
+    while pos < len(body):
+        tag, raw, content, pos = _tlv(body, pos)
+        out.append((tag, raw, content))
+    return out
+
+
+def _verify_cms(signature, data, cert):
+    """Check the signature over the signed attributes and their messageDigest."""
+    _, _, content_info, _ = _tlv(signature)
+    _, _, explicit = _children(content_info)[1]
+    signed_data = _children(_tlv(explicit)[2])
+    signer_infos = signed_data[-1]
+    assert signer_infos[0] == 0x31
+    fields = _children(_children(signer_infos[2])[0][2])
+    attrs = next(raw for tag, raw, _ in fields if tag == 0xA0)
+    sig = fields[-1][2]
+
+    assert hashlib.sha1(data).digest() in attrs          # messageDigest attribute
+    # the signature covers the [0] IMPLICIT attributes re-tagged as a SET
+    cert.public_key().verify(sig, b'\x31' + attrs[1:], padding.PKCS1v15(), hashes.SHA1())
+
+
+def _verify_openssl(signature, data, ca_path, tmp_path):
+    sig_path, data_path = tmp_path / 'signature', tmp_path / 'manifest.json'
+    sig_path.write_bytes(signature)
+    data_path.write_bytes(data)
+    proc = subprocess.run(
+        [OPENSSL, 'cms', '-verify', '-binary', '-inform', 'DER', '-in', str(sig_path),
+         '-content', str(data_path), '-CAfile', ca_path, '-purpose', 'any',
+         '-out', os.devnull],
+        capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+def test_cms_engine_signature_verifies(pki, tmp_path):
+    p12, ca_path, leaf = pki
+    with open(ca_path, 'rb') as f:
+        identity = signer.SigningIdentity(p12, P12_PASS, f.read())
+    signature = identity.sign(MANIFEST)
+
+    _verify_cms(signature, MANIFEST, leaf)
+    with pytest.raises(Exception):
+        _verify_cms(signature, MANIFEST + b' ', leaf)
+    if OPENSSL:
+        _verify_openssl(signature, MANIFEST, ca_path, tmp_path)
+
+
+@pytest.mark.skipif(OPENSSL is None, reason='openssl binary not on PATH')
+def test_openssl_engine_signature_verifies(pki, tmp_path, monkeypatch):
+    p12, ca_path, leaf = pki
+    monkeypatch.setattr(signer, 'OPENSSL', OPENSSL)
+    monkeypatch.setattr(signer, 'WWDR_PATH', ca_path)
+    pem_dir = tmp_path / 'pems'
+    pem_dir.mkdir()
+    cert_path, key_path = signer.extract_pems(p12, P12_PASS, str(pem_dir))
+    signature = signer.sign_openssl(cert_path, key_path, MANIFEST)
+
+    _verify_cms(signature, MANIFEST, leaf)
+    _verify_openssl(signature, MANIFEST, ca_path, tmp_path)
@@ -21,10 +21,17 @@ export async function getMetrics(idToken) {
     return response.json();
 }
 
-export async function listPasses(idToken) {
+/**
+ * One page of passes: {items, cursor}. Pass `cursor` back for the next page
+ * (null when there is none). params: {limit, cursor, status, emailPrefix, include}
+ */
+export async function listPasses(idToken, params = {}) {
     if (!idToken) throw new Error('User is not signed in');
     const headers = { Authorization: idToken };
-    const response = await fetch(buildUrl('/admin/passes'), { headers });
+    const qs = new URLSearchParams(
+        Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== '')
+    ).toString();
+    const response = await fetch(buildUrl(`/admin/passes${qs ? `?${qs}` : ''}`), { headers });
     if (!response.ok) {
         const text = await response.text();
         throw new Error(`Failed to fetch passes: ${response.status} ${text}`);
@@ -32,6 +39,18 @@ export async function listPasses(idToken) {
     return response.json();
 }
 
+/** Follow the cursor through every page (includes passData). */
+export async function listAllPasses(idToken, params = {}) {
+    const all = [];
+    let cursor = null;
+    do {
+        const page = await listPasses(idToken, { limit: 200, include: 'passData', ...params, cursor });
+        all.push(...page.items);
+        cursor = page.cursor;
+    } while (cursor);
+    return all;
+}
+
 export async function bulkSend(idToken) {
     if (!idToken) throw new Error('User is not signed in');
     const headers = { Authorization: idToken };
@@ -59,6 +78,16 @@ export async function createPass(body, idToken) {
     return response.json();
 }
 
+export async function createPasses(records, idToken) {
+    if (!idToken) throw new Error('User is not signed in');
+    const headers = {
+        'Content-Type': 'application/json',
+        Authorization: idToken };
+    const response = await fetch(buildUrl('/createPasses'), { method: 'POST', headers, body: JSON.stringify({ records }) });
+    if (!response.ok) throw new Error('Failed to create passes');
+    return response.json();          // {created, failed, results: [{index, ok, serialNumber?, error?}]}
+}
+
 export async function getPassData(serial, idToken) {
     if (!idToken) throw new Error('User is not signed in');
     const headers = { Authorization: idToken };
@@ -98,6 +127,29 @@ export async function updatePassData(
 }
 
 
+/**
+ * Apply one patch to many passes server-side: {updated, failed, pushed}.
+ * patch is a JSON merge patch; field arrays (headerFields, …) merge by `key`.
+ */
+export async function bulkUpdatePasses(serials, patch, idToken, files = {}) {
+    if (!idToken) throw new Error('User is not signed in');
+    const headers = {
+        'Content-Type': 'application/json',
+        Authorization: idToken
+    };
+    const res = await fetch(buildUrl('/admin/bulkUpdate'), {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ serials, patch, files })
+    });
+    if (!res.ok) {
+        const txt = await res.text();
+        throw new Error(`Failed to bulk update: ${res.status} ${txt}`);
+    }
+    return res.json();
+}
+
+
 /* ── mail helpers ───────────────────────────────────── */
 
 export async function mailPending(idToken) {
@@ -1,6 +1,8 @@
 import React, {useState} from 'react';
 import {useAuth} from 'react-oidc-context';
-import {createPass} from '../api';
+import {createPasses} from '../api';
+
+const BATCH_SIZE = 250;   // records per /createPasses call
 
 /* ───── helpers ─────────────────────────────────────────────── */
 const hexToRgb = h => {
@@ -95,25 +97,21 @@ export default function BulkCreate() {
         setCreating(true);
         let ok = 0, fail = 0;
 
-        for (const r of rows) {
+        for (let i = 0; i < rows.length; i += BATCH_SIZE) {
+            const chunk = rows.slice(i, i + BATCH_SIZE);
             try {
-                const pd = buildPassData(r);
-                console.log('🚀 Sending:', {
-                    email: r.email,
-                    firstName: r.firstname,
-                    lastName: r.lastname,
-                    passData: buildPassData(r)
-                });
-                await createPass({
+                const res = await createPasses(chunk.map(r => ({
                     email: r.email,
-                    passData: pd,
+                    passData: buildPassData(r),
                     firstName: r.firstname,
                     lastName: r.lastname
-                }, accessToken);
-                ok++;
+                })), accessToken);
+                ok += res.created;
+                fail += res.failed;
+                res.results.filter(x => !x.ok).forEach(x => console.error(x));
             } catch (err) {
                 console.error(err);
-                fail++;
+                fail += chunk.length;
             }
         }
         setResult({ok, fail});
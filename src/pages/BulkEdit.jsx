@@ -2,12 +2,13 @@
 import React, { useEffect, useState } from 'react';
 import { useAuth }                from 'react-oidc-context';
 import {
-    listPasses,
-    getPassData,
-    updatePassData,
+    listAllPasses,
+    bulkUpdatePasses,
     listTemplateFiles
 } from '../api';
 
+const BULK_CHUNK = 250;   // serials per /admin/bulkUpdate call
+
 /** ── Helpers ─────────────────────────────────────────────────── */
 const rgbToHex = rgb => {
     // expects "rgb(r,g,b)" or "rgb(r, g, b)"
@@ -64,7 +65,7 @@ export default function BulkEdit() {
     useEffect(() => {
         if (!idToken) return;
         setLoadingPasses(true);
-        listPasses(idToken)
+        listAllPasses(idToken)
             .then(setPasses)
             .catch(console.error)
             .finally(() => setLoadingPasses(false));
@@ -167,58 +168,73 @@ export default function BulkEdit() {
         }
         setSaving(true);
 
-        for (let serial of selected) {
+        // field keys come from the template, so the first pass is representative
+        let ticket = {};
+        try {
+            const pd = passes[0]?.passData;
+            ticket = (typeof pd === 'string' ? JSON.parse(pd) : pd)?.eventTicket || {};
+        } catch (err) {
+            console.error('Failed to parse first passData:', err);
+        }
+
+        // build one merge patch for the whole selection
+        const patch = {};
+        if (backgroundColor) patch.backgroundColor = backgroundColor;
+        if (foregroundColor) patch.foregroundColor = foregroundColor;
+        if (labelColor)      patch.labelColor      = labelColor;
+        if (logoText)        patch.logoText        = logoText;
+        if (relevantDate)    patch.relevantDate    = new Date(relevantDate).toISOString();
+
+        // a field without its key would replace the whole array, so only
+        // patch fields whose key the first pass tells us
+        const eventTicket = {};
+        const hdrKey  = ticket.headerFields?.[0]?.key;
+        const sec1Key = ticket.secondaryFields?.[0]?.key;
+        if ((hdrLabel || hdrValue) && hdrKey) {
+            eventTicket.headerFields = [{
+                key: hdrKey,
+                ...(hdrLabel && { label: hdrLabel }),
+                ...(hdrValue && { value: new Date(hdrValue).toISOString() })
+            }];
+        } else if (hdrLabel || hdrValue) {
+            console.warn('First pass has no header field key; header change skipped');
+        }
+        if ((sec1Label || sec1Value) && sec1Key) {
+            eventTicket.secondaryFields = [{
+                key: sec1Key,
+                ...(sec1Label && { label: sec1Label }),
+                ...(sec1Value && { value: sec1Value })
+            }];
+        } else if (sec1Label || sec1Value) {
+            console.warn('First pass has no secondary field key; secondary change skipped');
+        }
+        if (Object.keys(eventTicket).length) patch.eventTicket = eventTicket;
+
+        // file payload
+        const filesPayload = {};
+        for (let [name, file] of Object.entries(filesToUpload)) {
+            filesPayload[name] = await fileToBase64(file);
+        }
+
+        const serials = [...selected];
+        let updated = 0;
+        const failed = [];
+        for (let i = 0; i < serials.length; i += BULK_CHUNK) {
+            const chunk = serials.slice(i, i + BULK_CHUNK);
             try {
-                // fetch and merge
-                const pd = await getPassData(serial, idToken);
-                const merged = { ...(typeof pd === 'string' ? JSON.parse(pd) : pd) };
-
-                if (backgroundColor) merged.backgroundColor = backgroundColor;
-                if (foregroundColor) merged.foregroundColor = foregroundColor;
-                if (labelColor)      merged.labelColor      = labelColor;
-                if (logoText)        merged.logoText        = logoText;
-                if (relevantDate)    merged.relevantDate    = new Date(relevantDate).toISOString();
-
-                if (hdrLabel || hdrValue) {
-                    merged.eventTicket.headerFields = [
-                        {
-                            ...merged.eventTicket.headerFields[0],
-                            label: hdrLabel  || merged.eventTicket.headerFields[0].label,
-                            value: hdrValue
-                                ? new Date(hdrValue).toISOString()
-                                : merged.eventTicket.headerFields[0].value
-                        },
-                        ...merged.eventTicket.headerFields.slice(1)
-                    ];
-                }
-
-                if (sec1Label || sec1Value) {
-                    merged.eventTicket.secondaryFields = [
-                        {
-                            ...merged.eventTicket.secondaryFields[0],
-                            label: sec1Label || merged.eventTicket.secondaryFields[0].label,
-                            value: sec1Value || merged.eventTicket.secondaryFields[0].value
-                        },
-                        ...merged.eventTicket.secondaryFields.slice(1)
-                    ];
-                }
-
-                // file payload
-                const filesPayload = {};
-                for (let [name, file] of Object.entries(filesToUpload)) {
-                    filesPayload[name] = await fileToBase64(file);
-                }
-
-                // call update
-                await updatePassData(serial, merged, idToken, filesPayload);
+                const res = await bulkUpdatePasses(chunk, patch, idToken, filesPayload);
+                updated += res.updated;
+                failed.push(...res.failed.map(f => f.serialNumber));
             } catch (err) {
-                console.error(`Error updating ${serial}`, err);
-                alert(`Failed for ${serial}: ${err.message}`);
+                console.error('Bulk update failed', err);
+                failed.push(...chunk);
             }
         }
 
         setSaving(false);
-        alert('Bulk update complete');
+        alert(failed.length
+            ? `Updated ${updated}; failed for ${failed.join(', ')}`
+            : `Bulk update complete (${updated} passes)`);
     }
 
     if (loadingPasses || loadingTemplates) {
@@ -1,7 +1,12 @@
 import {useEffect, useState} from 'react';
 import {useAuth} from 'react-oidc-context';
 import {useNavigate} from 'react-router-dom';
-import {listPasses, mailPending, resendPass} from '../api';
+import {getMetrics, listPasses, mailPending, resendPass} from '../api';
+
+/* ───── paging ─────────────────────────────────────────────── */
+const PAGE_SIZE = 50;
+const STATUSES  = ['', 'pending', 'queued', 'Mailed', 'installed'];
+
 
 export default function Customers() {
     const auth     = useAuth();
@@ -20,34 +25,61 @@ export default function Customers() {
     const [sSeat,  setSSeat]  = useState('');
     const [sStatus,setSStatus]= useState('');
 
-    const refresh = () => {
+    const [cursor,  setCursor]  = useState(null);
+    const [loading, setLoading] = useState(false);
+    const [pendingCount, setPendingCount] = useState(0);
+
+    const load = reset => {
         if (!idToken) return;
-        listPasses(idToken).then(setRows);
+        setLoading(true);
+        listPasses(idToken, {
+            limit: PAGE_SIZE,
+            include: 'passData',
+            cursor: reset ? null : cursor,
+            emailPrefix: sEmail.trim(),
+            status: sStatus
+        })
+            .then(page => {
+                setRows(prev => (reset ? page.items : [...prev, ...page.items]));
+                setCursor(page.cursor);
+            })
+            .catch(console.error)
+            .finally(() => setLoading(false));
     };
 
-    useEffect(refresh, [idToken]);
+    // email prefix + status are filtered server-side: reload from page 1
+    useEffect(() => {
+        const t = setTimeout(() => load(true), 300);
+        return () => clearTimeout(t);
+    }, [idToken, sEmail, sStatus]);
 
-    const pendingCount = rows.filter(r => r.emailStatus === 'pending').length;
+    const loadPending = () => {
+        if (!idToken) return;
+        getMetrics(idToken).then(m => setPendingCount(m.pending || 0)).catch(console.error);
+    };
+
+    useEffect(loadPending, [idToken]);
+
+    const refresh = () => {
+        load(true);
+        loadPending();
+    };
 
     // filter, now reading names from r.firstName / r.lastName
     const filtered = rows.filter(r => {
         const pd     = JSON.parse(r.passData || '{}');
         const aux    = pd.eventTicket?.auxiliaryFields || [];
-        const email  = (r.email     || '').toLowerCase();
         const first  = (r.firstName || pd.firstName || '').toLowerCase();
         const last   = (r.lastName  || pd.lastName  || '').toLowerCase();
         const block  = (aux[0]?.value || '').toString().toLowerCase();
         const row    = (aux[1]?.value || '').toString().toLowerCase();
         const seat   = (aux[2]?.value || '').toString().toLowerCase();
-        const status = (r.emailStatus || '').toLowerCase();
 
-        return email.includes(sEmail.toLowerCase()) &&
-            first.includes(sFirst.toLowerCase()) &&
+        return first.includes(sFirst.toLowerCase()) &&
             last.includes(sLast.toLowerCase()) &&
             block.includes(sBlock.toLowerCase()) &&
             row.includes(sRow.toLowerCase()) &&
-            seat.includes(sSeat.toLowerCase()) &&
-            status.includes(sStatus.toLowerCase());
+            seat.includes(sSeat.toLowerCase());
     });
 
     const handleBulkSend = async () => {
@@ -91,12 +123,18 @@ export default function Customers() {
                 <tr>
                     {[sEmail,sFirst,sLast,sBlock,sRow,sSeat,sStatus].map((val,i) => (
                         <th key={i}>
-                            <input
-                                value={val}
-                                onChange={e => ([setSEmail,setSFirst,setSLast,setSBlock,setSRow,setSSeat,setSStatus][i])(e.target.value)}
-                                placeholder="Search"
-                                style={{width:'100%',padding:6}}
-                            />
+                            {i === 6 ? (
+                                <select value={val} onChange={e => setSStatus(e.target.value)} style={{width:'100%',padding:6}}>
+                                    {STATUSES.map(st => <option key={st} value={st}>{st || 'Any'}</option>)}
+                                </select>
+                            ) : (
+                                <input
+                                    value={val}
+                                    onChange={e => ([setSEmail,setSFirst,setSLast,setSBlock,setSRow,setSSeat][i])(e.target.value)}
+                                    placeholder={i === 0 ? 'Starts with' : 'Search'}
+                                    style={{width:'100%',padding:6}}
+                                />
+                            )}
                         </th>
                     ))}
                     <th/>
@@ -134,6 +172,12 @@ export default function Customers() {
                 })}
                 </tbody>
             </table>
+
+            {cursor && (
+                <button onClick={() => load(false)} disabled={loading} style={{marginTop: 12}}>
+                    {loading ? 'Loading…' : 'Load more'}
+                </button>
+            )}
         </>
     );
 }
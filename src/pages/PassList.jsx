@@ -10,6 +10,10 @@ const PREVIEW_WIDTH  = 260;
 const PREVIEW_HEIGHT = 160;
 /* ─────────────────────────────────────────────────────────────── */
 
+/* ───── paging ─────────────────────────────────────────────── */
+const PAGE_SIZE = 50;
+const STATUSES  = ['', 'pending', 'queued', 'Mailed', 'installed'];
+
 export default function PassList() {
     const auth     = useAuth();
     const idToken  = auth.user?.id_token;
@@ -28,12 +32,32 @@ export default function PassList() {
     const [sSeat,   setSSeat]   = useState('');
     const [sStatus, setSStatus] = useState('');
 
-    const refresh = () => {
+    const [cursor,  setCursor]  = useState(null);
+    const [loading, setLoading] = useState(false);
+
+    const load = reset => {
         if (!idToken) return;
-        listPasses(idToken).then(setRows);
+        setLoading(true);
+        listPasses(idToken, {
+            limit: PAGE_SIZE,
+            include: 'passData',
+            cursor: reset ? null : cursor,
+            emailPrefix: sEmail.trim(),
+            status: sStatus
+        })
+            .then(page => {
+                setRows(prev => (reset ? page.items : [...prev, ...page.items]));
+                setCursor(page.cursor);
+            })
+            .catch(console.error)
+            .finally(() => setLoading(false));
     };
 
-    useEffect(refresh, [idToken]);
+    // email prefix + status are filtered server-side: reload from page 1
+    useEffect(() => {
+        const t = setTimeout(() => load(true), 300);
+        return () => clearTimeout(t);
+    }, [idToken, sEmail, sStatus]);
 
     const startHover = (row, e) => {
         clearTimeout(hoverTimer);
@@ -68,22 +92,18 @@ export default function PassList() {
     const filtered = rows.filter(r => {
         const pd     = JSON.parse(r.passData || '{}');
         const aux    = pd.eventTicket?.auxiliaryFields || [];
-        const email  = (r.email     || '').toLowerCase();
         const first  = (r.firstName || pd.firstName || '').toLowerCase();
         const last   = (r.lastName  || pd.lastName  || '').toLowerCase();
         const block  = (aux[0]?.value || '').toString().toLowerCase();
         const row    = (aux[1]?.value || '').toString().toLowerCase();
         const seat   = (aux[2]?.value || '').toString().toLowerCase();
-        const status = (r.emailStatus || '').toLowerCase();
 
         return (
-            email.includes(sEmail.toLowerCase()) &&
             first.includes(sFirst.toLowerCase()) &&
             last.includes(sLast.toLowerCase()) &&
             block.includes(sBlock.toLowerCase()) &&
             row.includes(sRow.toLowerCase()) &&
-            seat.includes(sSeat.toLowerCase()) &&
-            status.includes(sStatus.toLowerCase())
+            seat.includes(sSeat.toLowerCase())
         );
     });
 
@@ -107,14 +127,24 @@ export default function PassList() {
                 <tr>
                     {[sEmail,sFirst,sLast,sBlock,sRow,sSeat,sStatus].map((val, i) => (
                         <th key={i} style={{ padding: '4px' }}>
-                            <input
-                                value={val}
-                                onChange={e =>
-                                    [setSEmail,setSFirst,setSLast,setSBlock,setSRow,setSSeat,setSStatus][i](e.target.value)
-                                }
-                                placeholder="Search"
-                                style={{ width: '100%', padding: 6, boxSizing: 'border-box' }}
-                            />
+                            {i === 6 ? (
+                                <select
+                                    value={val}
+                                    onChange={e => setSStatus(e.target.value)}
+                                    style={{ width: '100%', padding: 6, boxSizing: 'border-box' }}
+                                >
+                                    {STATUSES.map(st => <option key={st} value={st}>{st || 'Any'}</option>)}
+                                </select>
+                            ) : (
+                                <input
+                                    value={val}
+                                    onChange={e =>
+                                        [setSEmail,setSFirst,setSLast,setSBlock,setSRow,setSSeat][i](e.target.value)
+                                    }
+                                    placeholder={i === 0 ? 'Starts with' : 'Search'}
+                                    style={{ width: '100%', padding: 6, boxSizing: 'border-box' }}
+                                />
+                            )}
                         </th>
                     ))}
                     <th/>
@@ -155,6 +185,12 @@ export default function PassList() {
                 </tbody>
             </table>
 
+            {cursor && (
+                <button onClick={() => load(false)} disabled={loading} style={{ marginTop: 12 }}>
+                    {loading ? 'Loading…' : 'Load more'}
+                </button>
+            )}
+
             {preview && (
                 <HoverCard
                     data={preview.data}
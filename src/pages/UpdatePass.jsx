@@ -4,7 +4,7 @@ import { useAuth } from 'react-oidc-context';
 import Editor from '@monaco-editor/react';
 import {
     getPassData,
-    listPasses,
+    listAllPasses,
     updatePassData,
     listPassAssets
 } from '../api';
@@ -92,7 +92,7 @@ export default function UpdatePass() {
     useEffect(() => {
         setLoading(true);
         if (!token) return;
-        listPasses(token)
+        listAllPasses(token)
             .then(setPasses)
             .catch(console.error)
             .finally(() => setLoading(false));